@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from core.cache import catalog_cache, catalog_response, dump_json
 from db.models.adverts import Advert
 from core.auth import get_current_user
 from sqlalchemy.orm import Session
@@ -17,6 +18,7 @@ def create_advert(
 ):
     db_advert = Advert(**advert.dict())
     db.add(db_advert)
+    catalog_cache.bump(db)
     db.commit()
     db.refresh(db_advert)
     return db_advert
@@ -24,12 +26,16 @@ def create_advert(
 
 @router.get("/", response_model=list[AdvertRead])
 def read_adverts(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(Advert).offset(skip).limit(limit).all()
+    def build():
+        return dump_json(AdvertRead, db.query(Advert).offset(skip).limit(limit).all())
+
+    return catalog_response(request, db, ("adverts", skip, limit), build)
 
 @router.get("/{advert_id}", response_model=AdvertRead)
 def read_advert(
@@ -56,6 +62,7 @@ def update_advert(
     for key, value in advert.dict(exclude_unset=True).items():
         setattr(db_advert, key, value)
     
+    catalog_cache.bump(db)
     db.commit()
     db.refresh(db_advert)
     return db_advert
\ No newline at end of file
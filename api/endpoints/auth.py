@@ -1,19 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from db.session import get_db
 from db.models.user import User
-from core.security import verify_password, create_access_token
+from core.security import verify_and_update_password, create_access_token
+from core.auth import principal_cache
 from datetime import timedelta
 from core.config import settings
 
 router = APIRouter()
 
 @router.post("/token")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    # The session is sync, so its queries run on the threadpool rather than the event loop
+    user = await run_in_threadpool(db.query(User).filter(User.username == form_data.username).first)
+    if not user:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+    valid, new_hash = await verify_and_update_password(form_data.password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    if new_hash:
+        # The configured bcrypt cost changed since this hash was made
+        user.hashed_password = new_hash
+        await run_in_threadpool(db.commit)
+        principal_cache.invalidate(user.id)
     access_token = create_access_token(
         data={"sub": str(user.id)},
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -1,21 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
-from db.session import get_db
-from db.models import OrderItem, Order, DriverClaim, Driver
-from db.models import notify_user
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.session import get_async_db
+from db.models import OrderItem, Order, PaystackEvent
 from loguru import logger
-from core.auth import get_current_user
+from core.auth import get_current_user_async
+from core.tasks import task_queue
 from schemas import CheckoutRequest
 from core.config import settings
 from helpers import (
     create_order,
     create_order_items,
-    create_driver_claims,
+    notify_order_created,
+    dispatch_driver_claims,
     initialize_paystack_transaction,
-    verify_paystack_transaction
+    verify_webhook_signature
 )
 import json
-import requests
 
 router = APIRouter(prefix="/checkout", tags=["Checkout"])
 
@@ -23,8 +25,8 @@ router = APIRouter(prefix="/checkout", tags=["Checkout"])
 @router.post("/")
 async def create_checkout_session(
     payload: CheckoutRequest,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_user_async)
 ):
     if not payload.items:
         raise HTTPException(status_code=400, detail="Cart is empty")
@@ -34,25 +36,15 @@ async def create_checkout_session(
         amount_cents = int(total_amount * 100)
 
         # 1. Create Order
-        order = create_order(db, Order, current_user, payload, total_amount)
+        order = await create_order(db, Order, current_user, payload, total_amount)
 
         # 2. Create Order Items
-        create_order_items(db, OrderItem, order.id, payload.items)
-
-        # 3. Send user notification
-        notify_user(
-            db,
-            current_user.id,
-            f"Order #{order.id} is created and is being processed",
-            'Order Created',
-            'Order',
-            order.id
-        )
-
-        # 4. Notify Drivers
-        await create_driver_claims(db, Driver, DriverClaim, order)
-
-        # 5. Handle Payment
+        await create_order_items(db, OrderItem, order.id, payload.items)
+
+        # Commit before calling Paystack so the SQLite write lock isn't held for the round trip
+        await db.commit()
+
+        # 3. Handle Payment
         if payload.payment_method == "cash":
             response = {
                 "order_id": order.id,
@@ -60,7 +52,12 @@ async def create_checkout_session(
                 "payment_url": None
             }
         else:
-            init = initialize_paystack_transaction(payload, current_user.id, order.id, amount_cents, order.order_number)
+            try:
+                init = await initialize_paystack_transaction(payload, current_user.id, order.id, amount_cents, order.order_number)
+            except Exception:
+                order.payment_status = "failed"
+                await db.commit()
+                raise
             logger.critical(init)
             response = {
                 'order_id': order.id,
@@ -69,34 +66,55 @@ async def create_checkout_session(
                 'reference': init.get('reference')
             }
 
-        db.commit()
+        # 4. Notify the user and nearby drivers off the request path
+        task_queue.enqueue(notify_order_created, order.id)
+        task_queue.enqueue(dispatch_driver_claims, order.id)
+
         return response
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/paystack")
-async def paystack_webhook(request: Request, db: Session = Depends(get_db)):
+async def paystack_webhook(request: Request, db: AsyncSession = Depends(get_async_db)):
+    payload = await request.body()
+    # A valid signature proves the event came from Paystack, so no verify round-trip is needed
+    if not verify_webhook_signature(payload, request.headers.get("x-paystack-signature")):
+        raise HTTPException(status_code=401, detail="Invalid Paystack signature")
+
     try:
-        payload = await request.body()
         event = json.loads(payload)
 
         if event.get("event") == "charge.success":
-            reference = event["data"]["reference"]
-            verification = verify_paystack_transaction(reference)
-
-            if verification.get("status") and verification["data"]["status"] == "success":
-                metadata = verification["data"].get("metadata", {})
-                order_id = metadata.get("order_id")
-
+            data = event["data"]
+            reference = data["reference"]
+
+            already_processed = await db.scalar(
+                select(PaystackEvent.id).where(
+                    PaystackEvent.event == event["event"],
+                    PaystackEvent.reference == reference
+                )
+            )
+            if already_processed:
+                return {"status": "success"}
+
+            if data.get("status") == "success":
+                order_id = (data.get("metadata") or {}).get("order_id")
                 if order_id:
-                    order = db.query(Order).filter(Order.id == int(order_id)).first()
+                    order = await db.get(Order, int(order_id))
                     if order:
                         order.payment_status = "paid"
-                        db.commit()
+
+            db.add(PaystackEvent(event=event["event"], reference=reference))
+            try:
+                await db.commit()
+            except IntegrityError:
+                # A concurrent delivery of the same event won the race
+                await db.rollback()
         return {"status": "success"}
 
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Webhook error: {str(e)}")
\ No newline at end of file
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Webhook error: {str(e)}")
@@ -1,5 +1,6 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from sqlalchemy.orm import Session
+from core.cache import catalog_cache, catalog_response, dump_json
 from db.models.category import Category
 from db.session import get_db
 from schemas.category import CategoryCreate, CategoryUpdate, CategoryRead
@@ -17,18 +18,23 @@ def create_category(
 ):
     db_category = Category(**category.dict())
     db.add(db_category)
+    catalog_cache.bump(db)
     db.commit()
     db.refresh(db_category)
     return db_category
 
 @router.get("/", response_model=List[CategoryRead])
 def read_categories(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(Category).offset(skip).limit(limit).all()
+    def build():
+        return dump_json(CategoryRead, db.query(Category).offset(skip).limit(limit).all())
+
+    return catalog_response(request, db, ("categories", skip, limit), build)
 
 @router.get("/{category_id}", response_model=CategoryRead)
 def read_category(
@@ -53,6 +59,7 @@ def update_category(
         raise HTTPException(status_code=404, detail="Category not found")
     for key, value in category.dict(exclude_unset=True).items():
         setattr(db_category, key, value)
+    catalog_cache.bump(db)
     db.commit()
     db.refresh(db_category)
     return db_category
@@ -67,5 +74,6 @@ def delete_category(
     if not db_category:
         raise HTTPException(status_code=404, detail="Category not found")
     db.delete(db_category)
+    catalog_cache.bump(db)
     db.commit()
     return {"detail": "Category deleted"}
\ No newline at end of file
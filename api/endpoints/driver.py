@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from db.models.driver import Driver
 from db.models.user import User
-from core.auth import get_current_user
+from core.auth import get_current_user, get_current_user_async
 from db.models.user import User
 from schemas.driver import DriverCreate, DriverLocationUpdate, DriverRead, DriverUpdate 
-from db.session import get_db
+from db.session import get_db, get_async_db
+from helpers import driver_index, location_buffer
+from core.pubsub import hub, driver_topic
 from pydantic import BaseModel
 
 router = APIRouter(tags=["drivers"])
@@ -19,6 +22,7 @@ def create_driver(driver_create: DriverCreate, db: Session = Depends(get_db),cur
     db.add(db_driver)
     db.commit()
     db.refresh(db_driver)
+    driver_index.sync(db_driver)
     return db_driver
 
 @router.get("/{driver_id}", response_model=DriverRead)
@@ -27,14 +31,14 @@ def get_driver(driver_id: int, db: Session = Depends(get_db), current_user: User
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
     driver.driver_name = driver.user.full_name
-    return driver
+    return location_buffer.overlay(driver)
 
 @router.get("/user/{user_id}", response_model=DriverRead)
 def get_driver_by_user_id(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     driver = db.query(Driver).filter(Driver.user_id == user_id).first()
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
-    return driver
+    return location_buffer.overlay(driver)
 
 @router.put("/{driver_id}", response_model=DriverRead)
 def update_driver(driver_id: int, driver: DriverUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
@@ -42,11 +46,16 @@ def update_driver(driver_id: int, driver: DriverUpdate, db: Session = Depends(ge
     if not db_driver:
         raise HTTPException(status_code=404, detail="Driver not found")
     
-    for key, value in driver.dict(exclude_unset=True).items():
+    updates = driver.dict(exclude_unset=True)
+    for key, value in updates.items():
         setattr(db_driver, key, value)
+    if "latitude" in updates or "longitude" in updates:
+        # An explicit position wins over buffered pings
+        location_buffer.discard(driver_id)
     
     db.commit()
     db.refresh(db_driver)
+    driver_index.sync(location_buffer.overlay(db_driver))
     return db_driver
 
 @router.get("/", response_model=list[DriverRead])
@@ -57,6 +66,7 @@ def list_drivers(
     drivers = db.query(Driver).filter(Driver.is_active == True).all()
     for driver in drivers:
         driver.driver_name = driver.user.full_name if driver.user else "Unknown"
+        location_buffer.overlay(driver)
     return drivers
 
 @router.patch("/{driver_id}/status", response_model=DriverRead)
@@ -74,22 +84,28 @@ def set_driver_status(
     
     db.commit()
     db.refresh(db_driver)
+    driver_index.sync(location_buffer.overlay(db_driver))
     return db_driver
 
 
 @router.post("/driver/{driver_id}/location")
-def update_driver_location(
+async def update_driver_location(
     location: DriverLocationUpdate,
     driver_id: int,
-    db: Session = Depends(get_db),
-    current_user: Driver = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Driver = Depends(get_current_user_async)
 ):
     
-    current_driver = db.query(Driver).filter(Driver.id == driver_id).first()
-    current_driver.latitude = location.latitude
-    current_driver.longitude = location.longitude
-    db.commit()
-    db.refresh(current_driver)
+    # Only a driver's first ping touches the database; the buffer writes positions behind
+    if driver_id not in location_buffer:
+        current_driver = await db.get(Driver, driver_id)
+        if not current_driver:
+            raise HTTPException(status_code=404, detail="Driver not found")
+        current_driver.latitude = location.latitude
+        current_driver.longitude = location.longitude
+        driver_index.sync(current_driver)
+    location_buffer.record(driver_id, location.latitude, location.longitude)
+    hub.publish(driver_topic(driver_id), {"type": "position", "latitude": location.latitude, "longitude": location.longitude})
     return {"detail": "Location updated"}
 
 @router.delete("/{driver_id}", response_model=DriverRead)
@@ -105,4 +121,7 @@ def delete_driver(
     db_driver.is_active = False    
     db.commit()
     db.refresh(db_driver)
+    driver_index.remove(db_driver.id)
+    # Deactivated drivers stop being written behind; their last flushed position stays
+    location_buffer.discard(db_driver.id)
     return db_driver
\ No newline at end of file
@@ -5,6 +5,8 @@ from db.models.driver import Driver
 from db.models.order import Order
 from db.models import notify_user
 from db.session import get_db
+from helpers import driver_index
+from core.pubsub import publish_order_update
 from typing import List
 from core.auth import get_current_user
 from db.models.user import User
@@ -26,9 +28,9 @@ def claim_order(order_id: int, driver_id: int, db: Session = Depends(get_db), cu
 
     claim = DriverClaim(order_id=order_id, driver_id=current_driver.id)
     db.add(claim)
+    db.flush()
+    notify_user(db, current_driver.user_id, f"Claim #{claim.id} for Order #{claim.order_id} has been Created",'Claim Creation','Claim', claim.id)
     db.commit()
-    db.refresh(claim)
-    notify_user(db, claim.driver_id, f"Claim #{claim.id} for Order #{claim.order_id} has been Created",'Claim Creation','Claim', claim.id)
 
     
     return {"message": "Claim submitted for approval."}
@@ -60,8 +62,10 @@ def approve_driver_claim(
     order.delivery_status = "shipped"
     order.driver_id = driver.id  # optional if not already assigned
 
+    notify_user(db, driver.user_id, f"Claim #{claim.id} for Order #{claim.order_id} has been Approved",'Claim Approved','Claim', claim.id)
     db.commit()
-    notify_user(db, claim.driver_id, f"Claim #{claim.id} for Order #{claim.order_id} has been Approved",'Claim Approved','Claim', claim.id)
+    driver_index.remove(driver.id)
+    publish_order_update(order)
 
     return {"message": "Claim approved, driver marked busy, and order marked as shipped"}
 
@@ -101,8 +105,10 @@ def driver_approve_claim(
     for _claim in claims_to_cancel:
         _claim.status = "cancelled"
         
+    notify_user(db, driver.user_id, f"Claim #{claim.id} for Order #{claim.order_id} has been Approved",'Claim Approved','Claim', claim.id)
     db.commit()
-    notify_user(db, claim.driver_id, f"Claim #{claim.id} for Order #{claim.order_id} has been Approved",'Claim Approved','Claim', claim.id)
+    driver_index.remove(driver.id)
+    publish_order_update(order)
 
     return {"message": "Claim approved, driver marked busy, and order marked as shipped"}
 
@@ -117,8 +123,8 @@ def reject_claim(claim_id: int, db: Session = Depends(get_db), current_user=Depe
         raise HTTPException(status_code=400, detail="Claim already resolved")
 
     claim.status = "rejected"
+    notify_user(db, claim.driver.user_id, f"Claim #{claim.id} for Order #{claim.order_id} has been Rejected",'Claim Rejected','Claim', claim.id)
     db.commit()
-    notify_user(db, claim.driver_id, f"Claim #{claim.id} for Order #{claim.order_id} has been Rejected",'Claim Rejected','Claim', claim.id)
     return {"message": "Claim rejected."}
 
 @router.post("/driver/claims/{claim_id}/reject")
@@ -131,8 +137,8 @@ def driver_reject_claim(claim_id: int, db: Session = Depends(get_db), current_us
         raise HTTPException(status_code=400, detail="Claim already resolved")
 
     claim.status = "rejected"
+    notify_user(db, claim.driver.user_id, f"Claim #{claim.id} for Order #{claim.order_id} has been Rejected",'Claim Rejected','Claim', claim.id)
     db.commit()
-    notify_user(db, claim.driver_id, f"Claim #{claim.id} for Order #{claim.order_id} has been Rejected",'Claim Rejected','Claim', claim.id)
     return {"message": "Claim rejected."}
 
 
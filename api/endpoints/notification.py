@@ -1,33 +1,193 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from schemas import notifications
-from db.models.notifications import Notification
-from db.session import get_db
+from db.models.notifications import Notification, NotificationCounter, mark_notifications_seen
+from db.models.user import User
+from db.session import get_async_db
+from core.auth import get_current_user_async
+from core.config import settings
+from core.pubsub import Subscription, hub, user_topic
+from helpers import keyset_paginate_async
 
 router = APIRouter(tags=["notifications"])
 
+
+def format_event(notification) -> str:
+    data = notifications.NotificationRead.model_validate(notification, from_attributes=True).model_dump_json()
+    return f"id: {notification_id(notification)}\nevent: notification\ndata: {data}\n\n"
+
+
+def format_resync(last_id: int) -> str:
+    return f"id: {last_id}\nevent: resync\ndata: {{}}\n\n"
+
+
+def notification_id(notification) -> int:
+    return notification["id"] if isinstance(notification, dict) else notification.id
+
+
+async def notification_events(
+    subscription: Subscription,
+    backlog=(),
+    last_id: int = 0,
+    heartbeat: float = settings.SSE_HEARTBEAT_SECONDS,
+    resync: bool = False
+):
+    """
+    Server-sent events for one user: the missed `backlog` first, then live notifications.
+
+    The subscription is opened before the backlog is read, so anything created
+    in between arrives on both and is only sent once. With `resync` the stream
+    opens with a `resync` event instead, telling a client that fell too far
+    behind to reload its inbox. A comment line goes out every `heartbeat`
+    seconds to keep idle connections and proxies open.
+    """
+    try:
+        if resync:
+            yield format_resync(last_id)
+        for notification in backlog:
+            yield format_event(notification)
+            last_id = notification_id(notification)
+        while True:
+            try:
+                notification = await asyncio.wait_for(subscription.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if notification_id(notification) <= last_id:
+                continue
+            yield format_event(notification)
+            last_id = notification_id(notification)
+    finally:
+        subscription.close()
+
+
+@router.get("/stream")
+async def stream_notifications(
+    last_event_id: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    user_id = current_user.id
+    subscription = hub.subscribe(user_topic(user_id))
+
+    try:
+        backlog, last_id, resync = [], 0, False
+        if last_event_id and last_event_id.isdigit():
+            # Resume: replay what the client missed while it was disconnected
+            last_id = int(last_event_id)
+            result = await db.scalars(
+                select(Notification)
+                .where(Notification.user_id == user_id, Notification.id > last_id)
+                .order_by(Notification.id)
+                .limit(settings.SSE_BACKLOG_LIMIT + 1)
+            )
+            backlog = result.all()
+            if len(backlog) > settings.SSE_BACKLOG_LIMIT:
+                # Too much to replay: the client reloads /inbox and the stream goes live from the newest
+                last_id = await db.scalar(select(func.max(Notification.id)).where(Notification.user_id == user_id))
+                backlog, resync = [], True
+        await db.close()  # the stream itself never touches the database
+    except BaseException:
+        subscription.close()
+        raise
+
+    return StreamingResponse(
+        notification_events(subscription, backlog, last_id, resync=resync),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.post("/", response_model=notifications.NotificationRead)
-def create_notification(notification: notifications.NotificationCreate, db: Session = Depends(get_db)):
+async def create_notification(notification: notifications.NotificationCreate, db: AsyncSession = Depends(get_async_db)):
     db_notification = Notification(**notification.dict())
     db.add(db_notification)
-    db.commit()
-    db.refresh(db_notification)
+    await db.commit()
+    await db.refresh(db_notification)
     return db_notification
 
-@router.get("/user/{user_id}/unseen", response_model=list[notifications.NotificationRead])
-def get_user_unseen_notifications(user_id: int, db: Session = Depends(get_db)):
-    return db.query(Notification).filter_by(user_id=user_id, status="unseen").all()
+def _newest_unseen(limit: int):
+    return (
+        select(Notification)
+        .filter_by(status="unseen")
+        .order_by(Notification.created.desc(), Notification.id.desc())
+        .limit(limit)
+    )
+
+
+@router.get("/user/{user_id}/unseen", response_model=list[notifications.NotificationRead], deprecated=True)
+async def get_user_unseen_notifications(
+    user_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """The newest `limit` unseen notifications. Use `/inbox?unseen_only=true` to page through all of them."""
+    if user_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not allowed to read these notifications")
+    result = await db.scalars(_newest_unseen(limit).filter_by(user_id=user_id))
+    return result.all()
 
-@router.get("/unseen", response_model=list[notifications.NotificationRead])
-def get_all_unseen_notifications(db: Session = Depends(get_db)):
-    return db.query(Notification).filter_by(status="unseen").all()
+@router.get("/unseen", response_model=list[notifications.NotificationRead], deprecated=True)
+async def get_all_unseen_notifications(
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """Admins only: the newest `limit` unseen notifications across all users."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not allowed to read these notifications")
+    result = await db.scalars(_newest_unseen(limit))
+    return result.all()
 
 @router.put("/{notification_id}/mark-seen", response_model=notifications.NotificationRead)
-def mark_notification_seen(notification_id: int, db: Session = Depends(get_db)):
-    notification = db.query(Notification).filter_by(id=notification_id).first()
+async def mark_notification_seen(notification_id: int, db: AsyncSession = Depends(get_async_db)):
+    notification = await db.get(Notification, notification_id)
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     notification.status = "seen"
-    db.commit()
-    db.refresh(notification)
+    await db.commit()
+    await db.refresh(notification)
     return notification
+
+
+@router.get("/inbox", response_model=notifications.NotificationPage)
+async def get_inbox(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    unseen_only: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    statement = select(Notification).where(Notification.user_id == current_user.id)
+    if unseen_only:
+        statement = statement.where(Notification.status == "unseen")
+    items, next_cursor = await keyset_paginate_async(db, statement, Notification, cursor, limit)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+async def _unseen_count(db: AsyncSession, user_id: int) -> int:
+    counter = await db.get(NotificationCounter, user_id)
+    return counter.unseen if counter else 0
+
+
+@router.get("/unseen-count", response_model=notifications.UnseenCount)
+async def get_unseen_count(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return {"unseen": await _unseen_count(db, current_user.id)}
+
+
+@router.put("/mark-seen", response_model=notifications.MarkSeenResult)
+async def mark_notifications_seen_bulk(
+    payload: notifications.MarkSeenRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    updated = await db.run_sync(mark_notifications_seen, current_user.id, payload.ids)
+    await db.commit()
+    return {"updated": updated, "unseen": await _unseen_count(db, current_user.id)}
@@ -1,17 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from schemas.order import OrderCreate, OrderUpdate, OrderResponse, OrderLocationUpdate, OrderItemResponse
-from db.models.order import Order, OrderItem
+import asyncio
+from collections import defaultdict
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from starlette.websockets import WebSocketState
+from typing import List, Optional
+from schemas.order import OrderCreate, OrderUpdate, OrderResponse, OrderLocationUpdate, OrderItemResponse, OrderPage
+from db.models.order import Order, OrderItem, update_order_totals
 from db.models.driver_claims import DriverClaim
-from db.session import get_db
-from helpers import distance_between
-from sqlalchemy.orm import Session, joinedload
+from db.session import get_db, get_async_db
+from db.queries import order_query, decrement_stock
+from core.cache import catalog_cache
+from helpers import haversine_km, distances_from, driver_index, keyset_paginate, location_buffer
+from core.pubsub import hub, order_topic, driver_topic, publish_order_update
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from db.models.product import Product as ProductModel
 from db.models.driver import Driver
-from core.auth import get_current_user
+from core.auth import get_current_user, get_current_user_async, user_id_from_token
 from db.models.user import User
 from db.models import notify_user
-from sqlalchemy import desc
+from sqlalchemy import desc, insert
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -23,28 +30,39 @@ def create_order(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_order = Order(
-        user_id=current_user.id,
-    )
-    db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
-
+    quantities = defaultdict(int)
     for item in order.items:
-        product = db.query(ProductModel).filter(ProductModel.id == item.product_id).first()
-        if not product:
-            raise HTTPException(status_code=404, detail=f"Product {item.product_id} not found")
-
-        order_item = OrderItem(
-            order_id=db_order.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            price=product.price
-        )
-        product.stock -= item.quantity  # Decrease stock
-        db.add(product)  # Update product stock in the database
-        db.add(order_item)
-
+        quantities[item.product_id] += item.quantity
+
+    products = {
+        product.id: product
+        for product in db.query(ProductModel).filter(ProductModel.id.in_(quantities))
+    }
+    for product_id in quantities:
+        if product_id not in products:
+            raise HTTPException(status_code=404, detail=f"Product {product_id} not found")
+
+    # Decrement and create the order in one transaction, so a shortfall leaves nothing behind
+    if not decrement_stock(db, quantities):
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Insufficient stock for one or more products")
+
+    db_order = Order(user_id=current_user.id)
+    db.add(db_order)
+    db.flush()
+    # One executemany for all lines; bulk inserts skip the flush hook, so the total is set here
+    db.execute(insert(OrderItem), [
+        {
+            "order_id": db_order.id,
+            "product_id": item.product_id,
+            "name": products[item.product_id].name,
+            "quantity": item.quantity,
+            "price": products[item.product_id].price,
+        }
+        for item in order.items
+    ])
+    update_order_totals(db, [db_order.id])
+    catalog_cache.bump(db)
     db.commit()
     db.refresh(db_order)
     return db_order
@@ -55,24 +73,25 @@ def read_order(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    order = db.query(Order).filter(Order.id == order_id).first()
-    driver = None
-    if order.driver_id:
-        driver = db.query(Driver).filter(Driver.id == order.driver_id).first()
+    order = order_query(db, with_driver=True).filter(Order.id == order_id).first()
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    driver = order.driver
     
     # If current user is not a driver, fallback to the driver assigned to the order
     if not driver:
         driver = db.query(Driver).filter(Driver.user_id == current_user.id).first()
+    location_buffer.overlay(driver)
 
 
     distance_km = None
     if driver and order.delivery_status not in ['delivered', 'complete']:
         if all([driver.latitude is not None, driver.longitude is not None, order.destination_latitude is not None, order.destination_longitude is not None]):
-            distance_km = distance_between(
-            {'lat': driver.latitude, 'lng': driver.longitude},
-            {'lat': order.destination_latitude, 'lng': order.destination_longitude}
-        ) or 0
-        distance_km = round(distance_km, 2)
+            distance_km = haversine_km(
+                (driver.latitude, driver.longitude),
+                (order.destination_latitude, order.destination_longitude)
+            )
+            distance_km = round(distance_km, 2)
 
         order_data = OrderResponse(
                 id=order.id,
@@ -106,7 +125,7 @@ def update_order(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_order = db.query(Order).filter(Order.id == order_id, Order.user_id == current_user.id).first()
+    db_order = order_query(db).filter(Order.id == order_id, Order.user_id == current_user.id).first()
     if not db_order:
         raise HTTPException(status_code=404, detail="Order not found")
 
@@ -129,14 +148,16 @@ def delete_order(
     db.commit()
     return {"detail": "Order deleted successfully"}
 
-@router.get("/", response_model=List[OrderResponse])
+@router.get("/", response_model=OrderPage)
 def list_orders(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     
-    orders = db.query(Order).order_by(desc(Order.created)).all()
-    return orders
+    orders, next_cursor = keyset_paginate(order_query(db), Order, cursor, limit)
+    return {"items": orders, "next_cursor": next_cursor}
 
 @router.get("/{order_id}/items")
 def get_order_items(
@@ -170,6 +191,7 @@ def update_delivery_order_status(
     if not db_order:
         raise HTTPException(status_code=404, detail="Order not found")
 
+    driver = None
     # Require delivery_code when status is 'delivered'
     if status_data.status == 'delivered':
         if not status_data.delivery_code:
@@ -187,6 +209,9 @@ def update_delivery_order_status(
         db_order.delivery_status = status_data.status
         db.commit()
         db.refresh(db_order)
+        if driver:
+            driver_index.sync(location_buffer.overlay(driver))
+        publish_order_update(db_order)
 
     return db_order
 
@@ -207,41 +232,51 @@ def confirm_delivery(
         raise HTTPException(status_code=404, detail="Order not found")
     
     db_order.delivery_status = "completed"
+    notify_user(db, db_order.user_id, f"Order #{db_order.id} delivery has been Completed",'Order Completed','Order', db_order.id)
     db.commit()
     db.refresh(db_order)
-    notify_user(db, db_order.user_id, f"Order #{db_order.id} delivery has been Completed",'Order Completed','Order', db_order.id)
+    publish_order_update(db_order)
 
     return db_order
 
-@router.get("/user/{user_id}/orders", response_model=List[OrderResponse])
-def get_orders_by_user(user_id: int, db: Session = Depends(get_db),  current_user: User = Depends(get_current_user)):
-    orders = (
-        db.query(Order)
-        .filter(Order.user_id == user_id)
-        .order_by(Order.created.desc())
-        .all()
+@router.get("/user/{user_id}/orders", response_model=OrderPage)
+def get_orders_by_user(
+    user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    orders, next_cursor = keyset_paginate(
+        order_query(db).filter(Order.user_id == user_id),
+        Order, cursor, limit
     )
     
-    if not orders:
+    if not orders and not cursor:
         raise HTTPException(status_code=404, detail="No orders found for this user")
 
-    return orders
+    return {"items": orders, "next_cursor": next_cursor}
 
 
-@router.get("/driver/{driver_id}/orders", response_model=List[OrderResponse])
-def get_orders_by_driver(driver_id: int, db: Session = Depends(get_db),  current_user: User = Depends(get_current_user)):
-    orders = (
-        db.query(Order)
+@router.get("/driver/{driver_id}/orders", response_model=OrderPage)
+def get_orders_by_driver(
+    driver_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    orders, next_cursor = keyset_paginate(
+        order_query(db)
         .filter(Order.driver_id == driver_id)
-        .filter(Order.delivery_status == 'shipped')
-        .order_by(Order.created.desc())
-        .all()
+        .filter(Order.delivery_status == 'shipped'),
+        Order, cursor, limit
     )
     
-    if not orders:
+    if not orders and not cursor:
         raise HTTPException(status_code=404, detail="No orders found for this driver")
 
-    return orders
+    return {"items": orders, "next_cursor": next_cursor}
 
 @router.get("/available/orders", response_model=List[OrderResponse])
 def get_available_orders(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
@@ -249,8 +284,7 @@ def get_available_orders(db: Session = Depends(get_db), current_user: User = Dep
 
     if not driver:
         orders = (
-        db.query(Order)
-        .options(joinedload(Order.items))  # ✅ Eager-load order items
+        order_query(db)
         .filter(Order.driver_id == None)
         .order_by(Order.created.desc())
         .all()
@@ -258,8 +292,7 @@ def get_available_orders(db: Session = Depends(get_db), current_user: User = Dep
         return orders
 
     orders = (
-        db.query(Order)
-        .options(joinedload(Order.items))  # ✅ Eager-load order items
+        order_query(db)
         .filter(Order.driver_id == None)
         .order_by(Order.created.desc())
         .all()
@@ -268,17 +301,25 @@ def get_available_orders(db: Session = Depends(get_db), current_user: User = Dep
     if not orders:
         raise HTTPException(status_code=404, detail="No available orders found")
 
+    location_buffer.overlay(driver)
+
+    # Compute every driver-to-destination distance in one vectorized call
+    distances = {}
+    if driver.latitude is not None and driver.longitude is not None:
+        located = [
+            order for order in orders
+            if order.destination_latitude is not None and order.destination_longitude is not None
+        ]
+        if located:
+            computed = distances_from(
+                (driver.latitude, driver.longitude),
+                [(order.destination_latitude, order.destination_longitude) for order in located]
+            ).round(2)
+            distances = {order.id: float(distance) for order, distance in zip(located, computed)}
+
     result = []
     for order in orders:
-        distance = None
-        if (
-            driver.latitude is not None and driver.longitude is not None
-            and order.destination_latitude is not None and order.destination_longitude is not None
-        ):
-            distance = distance_between(
-                {'lat': driver.latitude, 'lng': driver.longitude},
-                {'lat': order.destination_latitude, 'lng': order.destination_longitude}
-            ) or 0
+        distance = distances.get(order.id)
 
         # 🔧 Manual mapping
         item_responses = [
@@ -310,33 +351,35 @@ def get_available_orders(db: Session = Depends(get_db), current_user: User = Dep
         result.append(order_data)
 
     return result
-@router.get("/status/{delivery_status}/driver/{driver_id}/orders", response_model=List[OrderResponse])
-def get_orders_by_delivery_status(delivery_status: str, driver_id: int, db: Session = Depends(get_db),  current_user: User = Depends(get_current_user)):
+@router.get("/status/{delivery_status}/driver/{driver_id}/orders", response_model=OrderPage)
+def get_orders_by_delivery_status(
+    delivery_status: str,
+    driver_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
     if delivery_status == 'unassigned':
-        orders = (
-            db.query(Order)
+        query = (
+            order_query(db)
             .filter(Order.driver_id.is_(None), Order.payment_status != 'unpaid')
-            .order_by(Order.created.desc())
-            .all()
         )
     elif delivery_status == 'assigned':
-        orders = (
-            db.query(Order)
+        query = (
+            order_query(db)
             .filter(Order.driver_id == driver_id)
-            .order_by(Order.created.desc())
-            .all()
         )
     elif delivery_status == 'delivered':
-        orders = (
-            db.query(Order)
+        query = (
+            order_query(db)
             .filter(Order.delivery_status == 'delivered', Order.driver_id == driver_id)
-            .order_by(Order.created.desc())
-            .all()
         )
     else:
         raise HTTPException(status_code=404, detail="No orders found for this driver")
 
-    return orders
+    orders, next_cursor = keyset_paginate(query, Order, cursor, limit)
+    return {"items": orders, "next_cursor": next_cursor}
 
 class AssignDriverRequest(BaseModel):
     driver_id: int
@@ -369,43 +412,155 @@ def assign_driver_to_order(
         status="approved"
     )
     db.add(driver_claim)
+    if driver:
+        # Notifications go to the driver's user account, not the drivers row
+        notify_user(db, driver.user_id, f"Order #{db_order.id} delivery has been Assigned a Driver",'Order Assigned','Order', db_order.id)
 
     db.commit()
     db.refresh(db_order)
-    notify_user(db, db_order.driver_id, f"Order #{db_order.id} delivery has been Assigned a Driver",'Order Assigned','Order', db_order.id)
+    if driver:
+        driver_index.remove(driver.id)
+    publish_order_update(db_order)
 
     return db_order
 
 @router.post("/order/{order_id}/location")
-def update_order_location(
+async def update_order_location(
     location: OrderLocationUpdate,
     order_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     
-    order = db.query(Order).filter(Order.id == order_id).first()
-    order.destination_latitude = location.latitude
-    order.destination_longitude = location.longitude
-    db.commit()
-    db.refresh(order)
+    order = await db.get(Order, order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    order.destination_latitude = location.destination_latitude
+    order.destination_longitude = location.destination_longitude
+    await db.commit()
+    publish_order_update(order)
     return {"detail": "Location updated"}
 
-@router.get("/driver/{driver_id}/delivered-orders", response_model=List[OrderResponse])
+@router.get("/driver/{driver_id}/delivered-orders", response_model=OrderPage)
 def get_driver_delivered_orders(
     driver_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    orders = (
-        db.query(Order)
+    orders, next_cursor = keyset_paginate(
+        order_query(db)
         .filter(
             Order.driver_id == driver_id,
             Order.delivery_status.in_(["delivered", "completed"])
-        )
-        .order_by(Order.created.desc())
-        .all()
+        ),
+        Order, cursor, limit
     )
-    if not orders:
+    if not orders and not cursor:
         raise HTTPException(status_code=404, detail="No delivered or completed orders found for this driver")
-    return orders
\ No newline at end of file
+    return {"items": orders, "next_cursor": next_cursor}
+
+TRACKING_DONE = ("delivered", "completed")
+
+
+def _position_frame(destination, lat, lng, previous_km):
+    distance_km = delta_km = None
+    if None not in destination:
+        distance_km = round(haversine_km((lat, lng), destination), 3)
+        if previous_km is not None:
+            delta_km = round(distance_km - previous_km, 3)
+    return {"type": "position", "latitude": lat, "longitude": lng, "distance_km": distance_km, "delta_km": delta_km}
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@router.websocket("/{order_id}/track")
+async def track_order(
+    websocket: WebSocket,
+    order_id: int,
+    token: str = Query(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Live tracking for one order.
+
+    Sends the order state on connect, then a frame whenever the order changes
+    or its driver reports a new position, with the distance to the destination
+    and how much it changed since the previous frame.
+    """
+    user_id = user_id_from_token(token)
+    user = await db.get(User, user_id) if user_id is not None else None
+    order = await db.get(Order, order_id) if user is not None else None
+    driver = await db.get(Driver, order.driver_id) if order is not None and order.driver_id else None
+    await db.close()  # nothing else is read from the database for the lifetime of the socket
+
+    allowed = order is not None and (
+        order.user_id == user.id
+        or (driver is not None and driver.user_id == user.id)
+        or user.role == "admin"
+    )
+    if not allowed:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = hub.subscribe(order_topic(order.id))
+    if order.driver_id:
+        subscription.add_topic(driver_topic(order.driver_id))
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(websocket))
+    try:
+        destination = (order.destination_latitude, order.destination_longitude)
+        driver_id = order.driver_id
+        await websocket.send_json({"type": "order", "driver_id": driver_id, "delivery_status": order.delivery_status})
+        if order.delivery_status in TRACKING_DONE:
+            return
+
+        previous_km = previous_position = None
+        position = location_buffer.get(driver_id) if driver else None
+        if position is None and driver is not None and driver.latitude is not None and driver.longitude is not None:
+            position = (driver.latitude, driver.longitude)
+        if position is not None:
+            frame = _position_frame(destination, *position, previous_km)
+            await websocket.send_json(frame)
+            previous_km, previous_position = frame["distance_km"], position
+
+        while True:
+            received = asyncio.ensure_future(subscription.get())
+            await asyncio.wait({received, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                received.cancel()
+                return
+            message = received.result()
+
+            if message["type"] == "order":
+                if message["driver_id"] != driver_id:
+                    if driver_id:
+                        subscription.remove_topic(driver_topic(driver_id))
+                    driver_id = message["driver_id"]
+                    if driver_id:
+                        subscription.add_topic(driver_topic(driver_id))
+                    previous_km = previous_position = None
+                destination = (message["destination_latitude"], message["destination_longitude"])
+                await websocket.send_json({
+                    "type": "order", "driver_id": driver_id, "delivery_status": message["delivery_status"]
+                })
+                if message["delivery_status"] in TRACKING_DONE:
+                    return
+            elif message["type"] == "position":
+                position = (message["latitude"], message["longitude"])
+                if position == previous_position:
+                    continue
+                frame = _position_frame(destination, *position, previous_km)
+                await websocket.send_json(frame)
+                previous_km, previous_position = frame["distance_km"], position
+    except WebSocketDisconnect:
+        pass
+    finally:
+        subscription.close()
+        disconnected.cancel()
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.close()
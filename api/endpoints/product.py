@@ -1,17 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Request, Response
 from fastapi.responses import FileResponse
 import os
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
+from core.cache import catalog_cache, catalog_response, dump_json, etag_matches
 from db.models.product import Product
 from db.session import get_db
 from schemas.product import ProductCreate, ProductUpdate, ProductRead
-from typing import List, Optional
+from typing import List, Literal, Optional
 from core.auth import get_current_user
 from db.models.user import User  # Assuming you have a User model
 from pydantic import BaseModel
+from core.config import settings
+from helpers.images import UploadLimitRoute, create_derivatives, derivative_filename, is_content_addressed, save_upload
 
-router = APIRouter()
-IMAGE_DIR = "/var/data/static/images"
+router = APIRouter(route_class=UploadLimitRoute)
+IMAGE_DIR = settings.IMAGE_DIR
 
 
 
@@ -30,11 +33,10 @@ async def create_product(
 ):
     image_filename = None
     if image:
-        os.makedirs(IMAGE_DIR, exist_ok=True)
-        image_filename = f"{name}_{image.filename}"
-        image_path = os.path.join(IMAGE_DIR, image_filename)
-        with open(image_path, "wb") as buffer:
-            buffer.write(await image.read())
+        image_filename = await save_upload(image, IMAGE_DIR)
+        # Identical bytes were uploaded before, so their derivatives already exist
+        if not os.path.exists(os.path.join(IMAGE_DIR, derivative_filename(image_filename, "full"))):
+            await create_derivatives(os.path.join(IMAGE_DIR, image_filename))
 
     product_data = {
         "name": name,
@@ -48,25 +50,35 @@ async def create_product(
     }
     db_product = Product(**product_data)
     db.add(db_product)
+    catalog_cache.bump(db)
     db.commit()
     db.refresh(db_product)
     return db_product
 
 @router.get("/", response_model=List[ProductRead])
 def read_products(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    products = db.query(Product).filter(Product.is_active == True, Product.stock > 0 ).offset(skip).limit(limit).all()
-    # Attach category name to each product if relationship exists
-    result = []
-    for product in products:
-        product_data = ProductRead.from_orm(product).dict()
-        product_data["category_name"] = product.category.name if product.category else None
-        result.append(product_data)
-    return result
+    def build():
+        products = (
+            db.query(Product)
+            .options(joinedload(Product.category))
+            .filter(Product.is_active == True, Product.stock > 0 )
+            .offset(skip).limit(limit).all()
+        )
+        # Attach category name to each product if relationship exists
+        result = []
+        for product in products:
+            product_data = ProductRead.from_orm(product).dict()
+            product_data["category_name"] = product.category.name if product.category else None
+            result.append(product_data)
+        return dump_json(ProductRead, result)
+
+    return catalog_response(request, db, ("products", skip, limit), build)
 
 @router.get("/{product_id}", response_model=ProductRead)
 def read_product(
@@ -122,6 +134,7 @@ def update_product(
         raise HTTPException(status_code=404, detail="Product not found")
     for key, value in product.dict(exclude_unset=True).items():
         setattr(db_product, key, value)
+    catalog_cache.bump(db)
     db.commit()
     db.refresh(db_product)
     return db_product
@@ -136,16 +149,41 @@ def delete_product(
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
     db.delete(db_product)
+    catalog_cache.bump(db)
     db.commit()
     return {"detail": "Product deleted"}
 
 
 @router.get("/images/{image_filename}")
-def get_image(image_filename: str):
-    image_path = os.path.join(IMAGE_DIR, image_filename)
+def get_image(
+    request: Request,
+    image_filename: str,
+    size: Optional[Literal["thumbnail", "card", "full"]] = None
+):
+    image_filename = os.path.basename(image_filename)
+    served_filename = image_filename
+    if size:
+        # Fall back to the original when no derivative has been generated yet
+        derivative = derivative_filename(image_filename, size)
+        if os.path.exists(os.path.join(IMAGE_DIR, derivative)):
+            served_filename = derivative
+    image_path = os.path.join(IMAGE_DIR, served_filename)
     if not os.path.exists(image_path):
         raise HTTPException(status_code=404, detail="Image not found")
-    return FileResponse(image_path)
+
+    if is_content_addressed(served_filename):
+        # The name is the content hash, so the bytes behind it never change
+        etag = f'"{os.path.splitext(served_filename)[0]}"'
+        cache_control = "public, max-age=31536000, immutable"
+    else:
+        # Legacy `{name}_{filename}` images can be replaced in place, so tag them by mtime and size
+        stat = os.stat(image_path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        cache_control = "public, no-cache"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(image_path, headers=headers)
 
 @router.patch("/{product_id}/deactivate", response_model=ProductRead)
 def deactivate_product(
@@ -157,6 +195,7 @@ def deactivate_product(
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
     db_product.is_active = False
+    catalog_cache.bump(db)
     db.commit()
     db.refresh(db_product)
     return db_product
@@ -174,6 +213,7 @@ def set_product_stock(
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
     db_product.stock = stock_update
+    catalog_cache.bump(db)
     db.commit()
     db.refresh(db_product)
     return db_product
\ No newline at end of file
@@ -9,6 +9,7 @@ from core.auth import get_current_user
 from db.models.user import User
 from db.models.driver import Driver
 from passlib.context import CryptContext
+from core.cache import catalog_cache
 import os
 import random
 import shutil
@@ -216,6 +217,7 @@ def seed_data(
         status="available"
     )
     db.add(driver_entry)
+    catalog_cache.bump(db)
     db.commit()
 
     return {"detail": "Seed data inserted successfully"}
\ No newline at end of file
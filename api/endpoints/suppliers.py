@@ -1,5 +1,6 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from core.cache import catalog_cache, catalog_response, dump_json
 from schemas.supplier import SupplierCreate, SupplierUpdate, Supplier, SupplierRead
 from db.models.supplier import Supplier as SupplierModel
 from db.session import get_db
@@ -17,6 +18,7 @@ def create_supplier(
 ):
     db_supplier = SupplierModel(**supplier.dict())
     db.add(db_supplier)
+    catalog_cache.bump(db)
     db.commit()
     db.refresh(db_supplier)
     return db_supplier
@@ -24,10 +26,14 @@ def create_supplier(
 
 @router.get("/", response_model=List[SupplierRead])
 def read_suppliers(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(SupplierModel).all()
+    def build():
+        return dump_json(SupplierRead, db.query(SupplierModel).all())
+
+    return catalog_response(request, db, ("suppliers",), build)
 
 @router.get("/{supplier_id}", response_model=Supplier)
 def read_supplier(
@@ -52,6 +58,7 @@ def update_supplier(
         raise HTTPException(status_code=404, detail="Supplier not found")
     for key, value in supplier.dict(exclude_unset=True).items():
         setattr(db_supplier, key, value)
+    catalog_cache.bump(db)
     db.commit()
     db.refresh(db_supplier)
     return db_supplier
@@ -66,5 +73,6 @@ def delete_supplier(
     if db_supplier is None:
         raise HTTPException(status_code=404, detail="Supplier not found")
     db.delete(db_supplier)
+    catalog_cache.bump(db)
     db.commit()
     return {"message": "Supplier deleted successfully"}
\ No newline at end of file
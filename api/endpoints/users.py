@@ -1,28 +1,29 @@
 import datetime
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from db.models.order import Order
 from schemas.user import UserCreate, UserRead, PushTokenPayload
-from db.models import User, Notification,Driver,Order
+from db.models import User, Notification, NotificationCounter, Driver, Order
 from db.session import get_db
 from sqlalchemy.orm import Session
-from core.security import get_password_hash
-from core.auth import get_current_user
+from core.security import get_password_hash_async
+from core.auth import get_current_user, principal_cache
 
 router = APIRouter()
 
 
 @router.post("/", response_model=UserRead)
-def create_user(
+async def create_user(
     user: UserCreate,
     db: Session = Depends(get_db)
 ):
-    # Check if the email is already registered
-    db_user = db.query(User).filter(User.email == user.email).first()
+    # Check if the email is already registered; the sync session's queries run on the threadpool
+    db_user = await run_in_threadpool(db.query(User).filter(User.email == user.email).first)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Hash the password before saving
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     new_user = User(
         email=user.email,
         full_name=user.full_name,
@@ -32,8 +33,8 @@ def create_user(
         is_active=True
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await run_in_threadpool(db.commit)
+    await run_in_threadpool(db.refresh, new_user)
     return new_user
 
 @router.get("/{user_id}", response_model=UserRead)
@@ -60,6 +61,7 @@ def update_user(
     for key, value in user.dict().items():
         setattr(db_user, key, value)
     db.commit()
+    principal_cache.invalidate(user_id)
     db.refresh(db_user)
     return db_user
 
@@ -76,6 +78,7 @@ def delete_user(
 
     # 2️⃣ Delete dependent rows manually
     db.query(Notification).filter(Notification.user_id == user_id).delete(synchronize_session=False)
+    db.query(NotificationCounter).filter(NotificationCounter.user_id == user_id).delete(synchronize_session=False)
     db.query(Order).filter(Order.user_id == user_id).delete(synchronize_session=False)
     db.query(Driver).filter(Driver.user_id == user_id).delete(synchronize_session=False)
     db.commit()
@@ -83,6 +86,7 @@ def delete_user(
     # 3️⃣ Delete the user
     db.delete(db_user)
     db.commit()
+    principal_cache.invalidate(user_id)
 
     return {"detail": "User and all related data deleted successfully"}
 
@@ -136,5 +140,6 @@ def check_credit_eligibility(user_id: int, db: Session = Depends(get_db),  curre
 def store_push_token(payload: PushTokenPayload, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     current_user.push_token = payload.pushToken
     db.commit()
+    principal_cache.invalidate(current_user.id)
     print(f"Received push token: {payload.pushToken}")
     return {"message": "Push token saved"}
\ No newline at end of file
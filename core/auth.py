@@ -1,27 +1,122 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from db.session import get_db
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from db.session import get_db, get_async_db
 from db.models.user import User
 from core.config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+
+class PrincipalCache:
+    """
+    Bounded TTL/LRU cache of authenticated users keyed by user id.
+
+    Entries are detached copies of the `User` row. Callers attach them to their
+    own session with `Session.merge(user, load=False)`, which costs no query.
+    """
+
+    def __init__(self, maxsize: int = settings.PRINCIPAL_CACHE_SIZE, ttl: float = settings.PRINCIPAL_CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user_id -> (expires_at, user)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user: User):
+        # Copy only the column values so the cached object is never tied to a session
+        snapshot = User(**{
+            column.key: getattr(user, column.key)
+            for column in inspect(User).column_attrs
+        })
+        make_transient_to_detached(snapshot)
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, snapshot)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+principal_cache = PrincipalCache()
+
+
+def user_id_from_token(token: str) -> Optional[int]:
+    """The user id in a valid access token, or None if the token is invalid or expired."""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        user_id = payload.get("sub")
+        return int(user_id) if user_id is not None else None
+    except (JWTError, ValueError):
+        return None
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    user_id = user_id_from_token(token)
+    if user_id is None:
+        raise _credentials_exception()
+
+    cached = principal_cache.get(user_id)
+    if cached is not None:
+        return db.merge(cached, load=False)
+
     user = db.query(User).filter(User.id == user_id).first()
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        raise _credentials_exception()
+    principal_cache.put(user)
+    return user
+
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """`get_current_user` for async endpoints: shares their AsyncSession, so no threadpool slot or sync connection."""
+    user_id = user_id_from_token(token)
+    if user_id is None:
+        raise _credentials_exception()
+
+    cached = principal_cache.get(user_id)
+    if cached is not None:
+        return await db.merge(cached, load=False)
+
+    user = await db.get(User, user_id)
+    if user is None:
+        raise _credentials_exception()
+    principal_cache.put(user)
+    return user
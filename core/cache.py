@@ -0,0 +1,119 @@
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Callable, Hashable, List, Optional, Type
+
+from fastapi import Request, Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+
+from db.models.catalog_version import CatalogVersion
+
+
+class CatalogCache:
+    """
+    Cache of pre-serialized catalog responses (products, categories, suppliers, adverts).
+
+    Entries are the final JSON bytes keyed by (endpoint, params) and tagged
+    with the catalog version they were built at. The version lives in the
+    `catalog_version` row, which every catalog write increments through
+    `bump(db)` in its own transaction, so all workers agree on it and ETags
+    survive restarts. Each lookup reads the version first (a primary-key
+    read), so a write made by any worker retires the entries of every other.
+    Concurrent misses for the same key are coalesced so only one request
+    rebuilds it while the others wait.
+    """
+
+    def __init__(self):
+        self._version = None  # version the entries belong to; a different one drops them
+        self._entries = {}  # key -> (version, bytes)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, db) -> int:
+        return db.scalar(select(CatalogVersion.version).where(CatalogVersion.id == 1)) or 0
+
+    def etag(self, key: Hashable, version: int) -> str:
+        """Strong ETag for `key` at catalog `version`."""
+        digest = hashlib.sha1(f"{version}:{key!r}".encode()).hexdigest()
+        return f'"{digest}"'
+
+    def bump(self, db):
+        """Move the shared catalog version on, as part of the caller's transaction. The caller commits."""
+        statement = insert(CatalogVersion).values(id=1, version=1)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[CatalogVersion.id],
+            set_={"version": CatalogVersion.version + 1},
+        ))
+
+    def get_or_build(self, key: Hashable, version: int, build: Callable[[], bytes]) -> bytes:
+        while True:
+            with self._lock:
+                if version != self._version:
+                    self._version = version
+                    self._entries.clear()
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == version:
+                    self.hits += 1
+                    return entry[1]
+                waiter = self._inflight.get((key, version))
+                if waiter is None:
+                    waiter = self._inflight[(key, version)] = threading.Event()
+                    self.misses += 1
+                    break
+            # Another request is already rebuilding this entry
+            waiter.wait()
+
+        try:
+            data = build()
+            with self._lock:
+                # Don't store a payload built from a catalog that has since changed
+                if self._version == version:
+                    self._entries[key] = (version, data)
+            return data
+        finally:
+            with self._lock:
+                self._inflight.pop((key, version), None)
+            waiter.set()
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def dump_json(schema: Type[BaseModel], rows) -> bytes:
+    """Serialize ORM rows (or dicts) as a JSON list of `schema`."""
+    adapter = _list_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+catalog_cache = CatalogCache()
+
+
+def catalog_response(request: Request, db, key: Hashable, build: Callable[[], bytes]) -> Response:
+    """
+    Serve a cached catalog payload with an ETag.
+
+    Only the shared catalog version is read before a matching `If-None-Match`
+    is answered with 304, so nothing else is loaded from the database or
+    serialized. The version is read in the same transaction as `build`, so
+    the payload matches the tag.
+    """
+    version = catalog_cache.version(db)
+    etag = catalog_cache.etag(key, version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    content = catalog_cache.get_or_build(key, version, build)
+    return Response(content=content, media_type="application/json", headers=headers)
@@ -5,11 +5,35 @@ class Settings(object):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    BCRYPT_ROUNDS: int = config("BCRYPT_ROUNDS", default=12, cast=int)
+    PASSWORD_HASH_WORKERS: int = config("PASSWORD_HASH_WORKERS", default=2, cast=int)
+    PASSWORD_HASH_MAX_QUEUE: int = config("PASSWORD_HASH_MAX_QUEUE", default=64, cast=int)
+    PRINCIPAL_CACHE_SIZE: int = config("PRINCIPAL_CACHE_SIZE", default=10000, cast=int)
+    PRINCIPAL_CACHE_TTL_SECONDS: float = config("PRINCIPAL_CACHE_TTL_SECONDS", default=60.0, cast=float)
     DEBUG: bool = config("DEBUG", default=False, cast=bool)
+    SQLITE_PROFILE: str = config("SQLITE_PROFILE", default="performance")  # "performance" or "default"
     SECRET_KEY: str = config('SECRET_KEY', 'jgcxkvhfxtrzrzrztcxryxycvjvj')
     PAYSTACK_SECRET_KEY: str = config("PAYSTACK_SECRET_KEY", "sljksbbsb")
     PAYSTACK_ENDPOINT: str = config("PAYSTACK_ENDPOINT","https://api.paystack.co/transaction/initialize")
     PAYSTACK_VERIFY: str = config("PAYSTACK_VERIFY","https://api.paystack.co/transaction/verify/")
+    PAYSTACK_CONNECT_TIMEOUT: float = config("PAYSTACK_CONNECT_TIMEOUT", default=3.0, cast=float)
+    PAYSTACK_READ_TIMEOUT: float = config("PAYSTACK_READ_TIMEOUT", default=10.0, cast=float)
+    PAYSTACK_MAX_RETRIES: int = config("PAYSTACK_MAX_RETRIES", default=2, cast=int)
+    PAYSTACK_POOL_SIZE: int = config("PAYSTACK_POOL_SIZE", default=10, cast=int)
+    EXPO_PUSH_ENDPOINT: str = config("EXPO_PUSH_ENDPOINT", "https://exp.host/--/api/v2/push/send")
+    PUSH_BATCH_SIZE: int = config("PUSH_BATCH_SIZE", default=100, cast=int)
+    PUSH_MAX_CONCURRENCY: int = config("PUSH_MAX_CONCURRENCY", default=4, cast=int)
+    PUSH_TIMEOUT_SECONDS: float = config("PUSH_TIMEOUT_SECONDS", default=10.0, cast=float)
+    IMAGE_DIR: str = config("IMAGE_DIR", "/var/data/static/images")
+    IMAGE_WORKERS: int = config("IMAGE_WORKERS", default=2, cast=int)
+    MAX_IMAGE_UPLOAD_BYTES: int = config("MAX_IMAGE_UPLOAD_BYTES", default=10 * 1024 * 1024, cast=int)
+    TASK_WORKERS: int = config("TASK_WORKERS", default=4, cast=int)
+    TASK_MAX_RETRIES: int = config("TASK_MAX_RETRIES", default=3, cast=int)
+    TASK_RETRY_BACKOFF_SECONDS: float = config("TASK_RETRY_BACKOFF_SECONDS", default=0.5, cast=float)
+    LOCATION_FLUSH_INTERVAL: float = config("LOCATION_FLUSH_INTERVAL", default=5.0, cast=float)
+    PUBSUB_QUEUE_SIZE: int = config("PUBSUB_QUEUE_SIZE", default=32, cast=int)
+    SSE_HEARTBEAT_SECONDS: float = config("SSE_HEARTBEAT_SECONDS", default=15.0, cast=float)
+    SSE_BACKLOG_LIMIT: int = config("SSE_BACKLOG_LIMIT", default=100, cast=int)
 
 
     class Config:
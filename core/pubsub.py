@@ -0,0 +1,125 @@
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Any, Optional
+
+from core.config import settings
+
+
+def order_topic(order_id: int) -> str:
+    return f"order:{order_id}"
+
+
+def driver_topic(driver_id: int) -> str:
+    return f"driver:{driver_id}"
+
+
+def user_topic(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+class Subscription:
+    """
+    A subscriber's bounded inbox on the event loop it subscribed from.
+
+    When a slow consumer lets the queue fill up, the oldest message is
+    dropped to make room, so a stalled connection never holds memory or
+    delays the publisher.
+    """
+
+    def __init__(self, hub: "PubSubHub", maxsize: int, loop: asyncio.AbstractEventLoop):
+        self.hub = hub
+        self.loop = loop
+        self.topics = set()
+        self.dropped = 0
+        self._queue = asyncio.Queue(maxsize)
+
+    def _put(self, message: Any):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(message)
+
+    async def get(self) -> Any:
+        return await self._queue.get()
+
+    def add_topic(self, topic: str):
+        self.hub._attach(self, topic)
+
+    def remove_topic(self, topic: str):
+        self.hub._detach(self, topic)
+
+    def close(self):
+        for topic in list(self.topics):
+            self.hub._detach(self, topic)
+
+
+class PubSubHub:
+    """
+    In-process publish/subscribe hub for live updates (order tracking, notifications).
+
+    `publish` can be called from the event loop or from the threadpool that
+    runs sync endpoints; messages are always handed to subscribers on their
+    own loop.
+    """
+
+    def __init__(self, queue_size: int = settings.PUBSUB_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._topics = defaultdict(set)  # topic -> {Subscription}
+        self._lock = threading.Lock()
+
+    def subscribe(self, *topics: str, maxsize: Optional[int] = None) -> Subscription:
+        """Subscribe to `topics`. Must be called from the event loop that will read the subscription."""
+        subscription = Subscription(self, maxsize or self.queue_size, asyncio.get_running_loop())
+        for topic in topics:
+            self._attach(subscription, topic)
+        return subscription
+
+    def _attach(self, subscription: Subscription, topic: str):
+        with self._lock:
+            self._topics[topic].add(subscription)
+            subscription.topics.add(topic)
+
+    def _detach(self, subscription: Subscription, topic: str):
+        with self._lock:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[topic]
+            subscription.topics.discard(topic)
+
+    def subscriber_count(self, topic: str) -> int:
+        with self._lock:
+            return len(self._topics.get(topic, ()))
+
+    def publish(self, topic: str, message: Any) -> int:
+        """Deliver `message` to every subscriber of `topic`. Returns the number of subscribers."""
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        if not subscribers:
+            return 0
+        try:
+            current_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            current_loop = None
+        for subscription in subscribers:
+            if subscription.loop is current_loop:
+                subscription._put(message)
+            elif not subscription.loop.is_closed():
+                subscription.loop.call_soon_threadsafe(subscription._put, message)
+        return len(subscribers)
+
+
+hub = PubSubHub()
+
+
+def publish_order_update(order):
+    """Tell trackers of `order` about its current driver, delivery status and destination."""
+    hub.publish(order_topic(order.id), {
+        "type": "order",
+        "driver_id": order.driver_id,
+        "delivery_status": order.delivery_status,
+        "destination_latitude": order.destination_latitude,
+        "destination_longitude": order.destination_longitude,
+    })
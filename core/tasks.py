@@ -0,0 +1,98 @@
+import asyncio
+import inspect
+from collections import defaultdict
+from typing import Callable, Optional
+
+from loguru import logger
+
+from core.config import settings
+
+
+class TaskQueue:
+    """
+    In-process background task queue served by a pool of asyncio workers.
+
+    Coroutine functions are awaited on the event loop, plain functions run in
+    a worker thread. Failed tasks are retried with exponential backoff, and
+    per-task counters of successes, retries and failures are kept in `stats`.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.TASK_WORKERS,
+        max_retries: int = settings.TASK_MAX_RETRIES,
+        retry_backoff: float = settings.TASK_RETRY_BACKOFF_SECONDS,
+    ):
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.stats = defaultdict(lambda: {"succeeded": 0, "retried": 0, "failed": 0})
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker_tasks = []
+
+    @property
+    def running(self) -> bool:
+        return self._queue is not None
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._queue is not None and self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._worker_tasks = [
+            loop.create_task(self._worker(), name=f"task-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self, timeout: float = 10.0):
+        """Let queued tasks finish (up to `timeout` seconds), then stop the workers."""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Task queue stopped with {self._queue.qsize()} tasks still pending")
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._queue = None
+        self._loop = None
+        self._worker_tasks = []
+
+    def enqueue(self, func: Callable, *args, name: Optional[str] = None, retries: Optional[int] = None, **kwargs):
+        """Schedule `func(*args, **kwargs)` to run in the background. Must be called from the event loop."""
+        self.start()
+        task_name = name or func.__name__
+        max_retries = self.max_retries if retries is None else retries
+        self._queue.put_nowait((task_name, func, args, kwargs, max_retries))
+
+    async def _run(self, func: Callable, args, kwargs):
+        if inspect.iscoroutinefunction(func):
+            await func(*args, **kwargs)
+        else:
+            await asyncio.to_thread(func, *args, **kwargs)
+
+    async def _worker(self):
+        while True:
+            task_name, func, args, kwargs, max_retries = await self._queue.get()
+            try:
+                for attempt in range(max_retries + 1):
+                    try:
+                        await self._run(func, args, kwargs)
+                        self.stats[task_name]["succeeded"] += 1
+                        break
+                    except Exception as e:
+                        if attempt == max_retries:
+                            self.stats[task_name]["failed"] += 1
+                            logger.error(f"Task {task_name} failed after {attempt + 1} attempts: {e!r}")
+                            break
+                        self.stats[task_name]["retried"] += 1
+                        logger.warning(f"Task {task_name} failed (attempt {attempt + 1}), retrying: {e!r}")
+                        await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+            finally:
+                self._queue.task_done()
+
+
+task_queue = TaskQueue()
@@ -0,0 +1,135 @@
+"""
+Versioned schema migrations.
+
+`Base.metadata.create_all` only creates missing tables, so changes to tables
+that already exist (such as new indexes) are shipped here instead. Every
+migration has a version and a list of SQL statements. Applied versions are
+recorded in `schema_migrations`, and `run_migrations` applies the pending
+ones in order, each in its own transaction.
+
+Every worker process runs this at startup, so each step takes SQLite's write
+lock up front (`BEGIN IMMEDIATE`) and re-checks what is already applied once
+it holds it. Concurrent workers then wait for each other instead of racing
+on `CREATE TABLE` or the `schema_migrations` insert.
+"""
+from typing import List, NamedTuple
+
+from loguru import logger
+from sqlalchemy import text
+
+from db.base import Base
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    statements: List[str]
+
+
+MIGRATIONS = [
+    Migration(1, "hot_filter_indexes", [
+        # Keyset pagination (also declared on the model for fresh databases).
+        # driver_id also serves `driver_id IS NULL` for available/unassigned orders.
+        "CREATE INDEX IF NOT EXISTS ix_orders_created_id ON orders (created, id)",
+        "CREATE INDEX IF NOT EXISTS ix_orders_user_id_created_id ON orders (user_id, created, id)",
+        "CREATE INDEX IF NOT EXISTS ix_orders_driver_id_created_id ON orders (driver_id, created, id)",
+        # Driver order lists filtered by delivery status (shipped / delivered)
+        "CREATE INDEX IF NOT EXISTS ix_orders_driver_id_delivery_status_created_id "
+        "ON orders (driver_id, delivery_status, created, id)",
+        # selectinload(Order.items) and the order total subquery
+        "CREATE INDEX IF NOT EXISTS ix_order_items_order_id ON order_items (order_id)",
+        # Existing-claim check
+        "CREATE INDEX IF NOT EXISTS ix_driver_claims_order_id_driver_id ON driver_claims (order_id, driver_id)",
+        # Pending system claims cancelled when a claim on the order is approved
+        "CREATE INDEX IF NOT EXISTS ix_driver_claims_order_id_status_claim_type "
+        "ON driver_claims (order_id, status, claim_type)",
+        # A driver's claims of one type, newest first
+        "CREATE INDEX IF NOT EXISTS ix_driver_claims_driver_id_claim_type_created "
+        "ON driver_claims (driver_id, claim_type, created)",
+        "CREATE INDEX IF NOT EXISTS ix_driver_claims_claim_type_created ON driver_claims (claim_type, created)",
+        "CREATE INDEX IF NOT EXISTS ix_notifications_user_id_status ON notifications (user_id, status)",
+        "CREATE INDEX IF NOT EXISTS ix_notifications_unseen ON notifications (user_id) WHERE status = 'unseen'",
+        # Catalog listing: active products that are in stock
+        "CREATE INDEX IF NOT EXISTS ix_products_active_stock ON products (stock) WHERE is_active = 1",
+        "CREATE INDEX IF NOT EXISTS ix_products_category_id ON products (category_id)",
+        "CREATE INDEX IF NOT EXISTS ix_drivers_is_active_status ON drivers (is_active, status)",
+    ]),
+    Migration(2, "notification_inbox", [
+        "CREATE TABLE IF NOT EXISTS notification_counters ("
+        "user_id INTEGER NOT NULL PRIMARY KEY REFERENCES users (id), "
+        "unseen INTEGER NOT NULL)",
+        "INSERT INTO notification_counters (user_id, unseen) "
+        "SELECT user_id, count(*) FROM notifications WHERE status = 'unseen' GROUP BY user_id "
+        "ON CONFLICT (user_id) DO UPDATE SET unseen = excluded.unseen",
+        # Inbox pages, newest first on (created, id), optionally only unseen
+        "CREATE INDEX IF NOT EXISTS ix_notifications_user_id_created_id ON notifications (user_id, created, id)",
+        "CREATE INDEX IF NOT EXISTS ix_notifications_user_id_status_created_id "
+        "ON notifications (user_id, status, created, id)",
+        "DROP INDEX IF EXISTS ix_notifications_user_id_status",
+    ]),
+    Migration(3, "catalog_version", [
+        "CREATE TABLE IF NOT EXISTS catalog_version ("
+        "id INTEGER NOT NULL PRIMARY KEY, "
+        "version INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)",
+    ]),
+]
+
+
+def applied_versions(connection) -> set:
+    connection.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "name VARCHAR NOT NULL, "
+        "applied DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    return set(connection.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def _begin_exclusive(connection):
+    # Take the write lock now rather than at the first write, so the checks below see a settled schema
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def run_migrations(engine, migrations: List[Migration] = MIGRATIONS) -> List[int]:
+    """
+    Apply every migration whose version is not yet recorded.
+
+    Returns:
+        list: The versions applied by this call.
+    """
+    with engine.connect() as connection:
+        _begin_exclusive(connection)
+        done = applied_versions(connection)
+        connection.commit()
+
+    applied = []
+    for migration in sorted(migrations, key=lambda migration: migration.version):
+        if migration.version in done:
+            continue
+        with engine.connect() as connection:
+            _begin_exclusive(connection)
+            if migration.version in applied_versions(connection):
+                # Another worker applied it while we waited for the lock
+                connection.rollback()
+                continue
+            for statement in migration.statements:
+                connection.execute(text(statement))
+            connection.execute(
+                text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                {"version": migration.version, "name": migration.name},
+            )
+            connection.commit()
+        logger.info(f"Applied migration {migration.version} ({migration.name})")
+        applied.append(migration.version)
+    return applied
+
+
+def prepare_database(engine) -> List[int]:
+    """Create missing tables, then apply pending migrations. Safe to run from several workers at once."""
+    with engine.connect() as connection:
+        _begin_exclusive(connection)
+        Base.metadata.create_all(bind=connection)
+        connection.commit()
+    return run_migrations(engine)
@@ -1,5 +1,5 @@
 # filepath: fruit-ordering-platform/fruit-ordering-platform/app/db/models/__init__.py
-from .order import Order, OrderItem
+from .order import Order, OrderItem, update_order_totals, backfill_order_totals
 from .supplier import Supplier
 from .user import User
 from .product import Product
@@ -7,4 +7,6 @@ from .category import Category
 from .cart import Cart
 from .driver import Driver
 from .driver_claims import DriverClaim
-from .notifications import Notification, notify_user
+from .notifications import Notification, NotificationCounter, notify_user, adjust_unseen_counts, mark_notifications_seen
+from .payment_event import PaystackEvent
+from .catalog_version import CatalogVersion
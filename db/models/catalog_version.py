@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer
+from db.base import Base
+
+
+class CatalogVersion(Base):
+    """Single-row counter bumped by every catalog write; shared by all workers through the database."""
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
-from sqlalchemy.orm import relationship
+from collections import Counter
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, bindparam, event, inspect, func, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import column_property, relationship
 from datetime import datetime
 from db.base import Base
 from sqlalchemy.orm import Session
+from core.pubsub import hub, user_topic
 
 
 class Notification(Base):
@@ -14,12 +17,60 @@ class Notification(Base):
     header = Column(String,nullable=False)
     event_type = Column(String, nullable=False)
     object_id = Column(Integer, nullable=False)
-    status = Column(String, default="unseen")  # unseen, seen, etc.
+    # active_history loads the old status before it is overwritten, even on an
+    # expired instance, so the unseen counter can tell what the change was
+    status = column_property(Column(String, default="unseen"), active_history=True)  # unseen, seen, etc.
     created = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="notifications")
 
 
+class NotificationCounter(Base):
+    """Per-user count of unseen notifications, so the badge is a primary-key lookup."""
+    __tablename__ = "notification_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    unseen = Column(Integer, nullable=False, default=0)
+
+
+def adjust_unseen_counts(db: Session, deltas):
+    """
+    Add `deltas` (user id -> change in unseen notifications) to the counters in one upsert.
+
+    Counters never go below zero, including a new counter created by a negative delta.
+    """
+    rows = [{"user_id": user_id, "delta": delta} for user_id, delta in deltas.items() if delta]
+    if not rows:
+        return
+    statement = insert(NotificationCounter).values(user_id=bindparam("user_id"), unseen=func.max(bindparam("delta"), 0))
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[NotificationCounter.user_id],
+            set_={"unseen": func.max(NotificationCounter.unseen + bindparam("delta"), 0)},
+        ),
+        rows,
+    )
+
+
+def mark_notifications_seen(db: Session, user_id: int, ids=None) -> int:
+    """
+    Mark the user's unseen notifications (or only `ids`) as seen with one UPDATE.
+
+    The counter is decremented by the number of rows changed. The caller commits.
+    """
+    statement = (
+        update(Notification)
+        .where(Notification.user_id == user_id, Notification.status == "unseen")
+        .values(status="seen")
+        .execution_options(synchronize_session=False)
+    )
+    if ids is not None:
+        statement = statement.where(Notification.id.in_(ids))
+    updated = db.execute(statement).rowcount
+    adjust_unseen_counts(db, {user_id: -updated})
+    return updated
+
+
 def notify_user(
     db: Session,
     user_id: int,
@@ -28,6 +79,13 @@ def notify_user(
     event_type: str,
     object_id: int
 ):
+    """
+    Add a notification to the caller's transaction.
+
+    Nothing is flushed or committed here: the row is written, counted and
+    published with the caller's own commit, so notifying costs no extra
+    transaction.
+    """
     notif = Notification(
         user_id=user_id,
         message=message,
@@ -36,6 +94,53 @@ def notify_user(
         object_id=object_id,
     )
     db.add(notif)
-    db.commit()
-    db.refresh(notif)
     return notif
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_new_notifications(session, flush_context):
+    created = [
+        {column.key: getattr(obj, column.key) for column in inspect(Notification).column_attrs}
+        for obj in session.new
+        if isinstance(obj, Notification)
+    ]
+    if created:
+        session.info.setdefault("notifications_created", []).extend(created)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_new_notifications(session):
+    # Only once the rows are committed, so subscribers never see a rolled back notification
+    for notification in session.info.pop("notifications_created", ()):
+        hub.publish(user_topic(notification["user_id"]), notification)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_new_notifications(session):
+    session.info.pop("notifications_created", None)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_unseen_count_changes(session, flush_context):
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Notification) and obj.status == "unseen":
+            deltas[obj.user_id] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Notification) and obj.status == "unseen":
+            deltas[obj.user_id] -= 1
+    for obj in session.dirty:
+        if isinstance(obj, Notification):
+            history = inspect(obj).attrs.status.history
+            if history.has_changes():
+                was_unseen = "unseen" in (history.deleted or ())
+                deltas[obj.user_id] += (obj.status == "unseen") - was_unseen
+    if deltas:
+        session.info.setdefault("unseen_count_deltas", Counter()).update(deltas)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _write_unseen_count_changes(session, flush_context):
+    deltas = session.info.pop("unseen_count_deltas", None)
+    if deltas:
+        adjust_unseen_counts(session, deltas)
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, func, Float, String
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, func, Float, String, Index, event, select, update, inspect
+from sqlalchemy.orm import relationship, synonym, Session
 import random
 from db.base import Base
 
@@ -16,11 +16,17 @@ def generate_delivery_code():
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Keyset pagination indexes, newest first on (created, id)
+        Index("ix_orders_created_id", "created", "id"),
+        Index("ix_orders_user_id_created_id", "user_id", "created", "id"),
+        Index("ix_orders_driver_id_created_id", "driver_id", "created", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     driver_id = Column(Integer, ForeignKey("drivers.id"), nullable=True)
-    total_amount = Column(Float, nullable=False)
+    total_amount = Column(Float, nullable=False, default=0)  # kept in sync with the order items
     destination_address = Column(String, nullable=True)
     order_number = Column(String, unique=True, nullable=False, default=generate_order_id)
     destination_latitude = Column(Float, nullable=True)
@@ -39,9 +45,7 @@ class Order(Base):
     user = relationship("User", back_populates="orders")
     claim = relationship("DriverClaim", uselist=False, back_populates="order")
     
-    @property
-    def total(self):
-        return sum(item.price * item.quantity for item in self.items)
+    total = synonym("total_amount")
 
 
 
@@ -58,3 +62,59 @@ class OrderItem(Base):
 
     order = relationship("Order", back_populates="items")
     product = relationship("Product", back_populates="order_items")
+
+
+def _order_total_subquery():
+    return (
+        select(func.coalesce(func.sum(OrderItem.price * OrderItem.quantity), 0))
+        .where(OrderItem.order_id == Order.id)
+        .scalar_subquery()
+    )
+
+
+def update_order_totals(db, order_ids):
+    """Recompute the stored total_amount of the given orders from their items in one UPDATE."""
+    order_ids = [order_id for order_id in set(order_ids) if order_id is not None]
+    if not order_ids:
+        return
+    db.execute(
+        update(Order)
+        .where(Order.id.in_(order_ids))
+        .values(total_amount=_order_total_subquery())
+        .execution_options(synchronize_session=False)
+    )
+    for order_id in order_ids:
+        order = db.identity_map.get((Order, (order_id,), None))
+        if order is not None:
+            db.expire(order, ["total_amount"])
+
+
+def backfill_order_totals(db):
+    """Recompute total_amount for every order, e.g. for rows written before totals were maintained."""
+    result = db.execute(
+        update(Order)
+        .values(total_amount=_order_total_subquery())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_order_totals(session, flush_context):
+    order_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, OrderItem):
+            history = inspect(obj).attrs.order_id.history
+            order_ids.update(history.added or ())
+            order_ids.update(history.unchanged or ())
+            order_ids.update(history.deleted or ())
+    if order_ids:
+        session.info.setdefault("order_totals_pending", set()).update(order_ids)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _write_changed_order_totals(session, flush_context):
+    order_ids = session.info.pop("order_totals_pending", None)
+    if order_ids:
+        update_order_totals(session, order_ids)
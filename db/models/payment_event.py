@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from datetime import datetime
+from db.base import Base
+
+
+class PaystackEvent(Base):
+    __tablename__ = "paystack_events"
+    __table_args__ = (
+        UniqueConstraint("event", "reference", name="uq_paystack_events_event_reference"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    event = Column(String, nullable=False)  # e.g., "charge.success"
+    reference = Column(String, nullable=False)
+    created = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,47 @@
+from typing import Dict
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from db.models.order import Order
+from db.models.product import Product
+
+
+def order_query(db: Session, with_driver: bool = False):
+    """
+    Base query for orders that are serialized as `OrderResponse`.
+
+    Items are loaded with one extra `IN` query for the whole result set, so
+    serializing a list of orders never lazy-loads items order by order.
+    """
+    query = db.query(Order).options(selectinload(Order.items))
+    if with_driver:
+        query = query.options(joinedload(Order.driver))
+    return query
+
+
+_decrement_stock = (
+    update(Product.__table__)
+    .where(
+        Product.__table__.c.id == bindparam("product_id"),
+        Product.__table__.c.stock >= bindparam("quantity"),
+    )
+    .values(stock=Product.__table__.c.stock - bindparam("quantity"))
+)
+
+
+def decrement_stock(db: Session, quantities: Dict[int, int]) -> bool:
+    """
+    Take `quantities` (product id -> units) out of stock in one executemany.
+
+    Each row is only updated while it still has enough stock, so concurrent
+    orders can never drive it negative. Returns False if any product was
+    short; the caller must then roll back.
+    """
+    if not quantities:
+        return True
+    result = db.execute(_decrement_stock, [
+        {"product_id": product_id, "quantity": quantity}
+        for product_id, quantity in quantities.items()
+    ])
+    return result.rowcount == len(quantities)
@@ -1,6 +1,9 @@
 import os
-from sqlalchemy import create_engine
+from loguru import logger
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from core.config import settings
 
 DATABASE_URL = "sqlite:////var/data/app.db"  # Persistent disk path on Render
 
@@ -14,15 +17,74 @@ try:
 except Exception as e:
     print(e)
     DATABASE_URL = "sqlite:///db.sqlite3"
+
+# PRAGMAs applied to every new SQLite connection, selected with SQLITE_PROFILE
+SQLITE_PROFILES = {
+    # SQLite's own defaults: rollback journal, synchronous=FULL, small cache, no mmap
+    "default": {},
+    # WAL lets readers proceed while a writer commits; NORMAL is durable across app crashes in WAL mode
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,  # negative means KiB, so ~64 MB
+        "mmap_size": 268435456,  # 256 MB
+        "busy_timeout": 5000,  # ms to wait on a locked database before failing
+        "temp_store": "MEMORY",
+    },
+}
+
+
+def apply_sqlite_profile(engine, profile: str = settings.SQLITE_PROFILE):
+    if engine.dialect.name != "sqlite":
+        return
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE {profile!r}, expected one of {sorted(SQLITE_PROFILES)}")
+    pragmas = SQLITE_PROFILES[profile]
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def log_sqlite_pragmas(engine, profile: str = settings.SQLITE_PROFILE):
+    """Startup self-check: log the PRAGMAs a fresh connection actually runs with."""
+    if engine.dialect.name != "sqlite":
+        return {}
+    with engine.connect() as connection:
+        active = {
+            name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in ("journal_mode", "synchronous", "cache_size", "mmap_size", "busy_timeout", "temp_store")
+        }
+    logger.info(f"SQLite profile {profile!r} active pragmas: {active}")
+    expected_journal = SQLITE_PROFILES[profile].get("journal_mode")
+    if expected_journal and str(active["journal_mode"]).lower() != expected_journal.lower():
+        logger.warning(f"SQLite journal_mode is {active['journal_mode']!r}, expected {expected_journal!r}")
+    return active
+
+
 engine = create_engine(
     DATABASE_URL, connect_args={"check_same_thread": False}
 )
+apply_sqlite_profile(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async engine over the same database for endpoints that run on the event loop
+ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+apply_sqlite_profile(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
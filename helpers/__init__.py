@@ -1,4 +1,8 @@
-from helpers.distance import distance_between
+from helpers.distance import distance_between, haversine_km, distances_from, pairwise_distances
+from helpers.driver_index import driver_index
+from helpers.location_buffer import location_buffer, LocationBuffer
 from helpers.nearby_drivers import get_nearby_drivers   
-from helpers.cart_helpers import create_order, create_order_items, create_driver_claims, initialize_paystack_transaction, verify_paystack_transaction
-from helpers.notifications import send_push_notification
\ No newline at end of file
+from helpers.cart_helpers import create_order, create_order_items, create_driver_claims, notify_order_created, dispatch_driver_claims, initialize_paystack_transaction, verify_paystack_transaction
+from helpers.notifications import send_push_notification, push_dispatcher, build_push_message
+from helpers.paystack import paystack_client, PaystackClient, PaystackError, verify_webhook_signature
+from helpers.pagination import keyset_paginate, keyset_paginate_async, encode_cursor, decode_cursor
@@ -1,11 +1,16 @@
+import asyncio
+
 from helpers import get_nearby_drivers
-from helpers.notifications import send_push_notification
+from helpers.notifications import push_dispatcher, build_push_message
+from helpers.paystack import paystack_client
 import stripe
-import requests
 from core.config import settings
+from db.session import SessionLocal
+from db.models import Order, Driver, DriverClaim, notify_user, update_order_totals
+from sqlalchemy import insert
 from loguru import logger
 
-def create_order(db, Order,user, payload, total_amount):
+async def create_order(db, Order,user, payload, total_amount):
     order = Order(
         user_id=user.id,
         total_amount=total_amount,
@@ -18,47 +23,101 @@ def create_order(db, Order,user, payload, total_amount):
         payment_status="credit" if payload.payment_method == 'credit' else "unpaid",
     )
     db.add(order)
-    db.flush()
+    await db.flush()
     return order
 
 
-def create_order_items(db, OrderItem, order_id, items):
-    for item in items:
-        order_item = OrderItem(
-            order_id=order_id,
-            name=item.name,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            price=item.price
-        )
-        db.add(order_item)
+async def create_order_items(db, OrderItem, order_id, items):
+    # One executemany for every line; bulk inserts skip the flush hook, so the total is set here
+    await db.execute(insert(OrderItem), [
+        {
+            "order_id": order_id,
+            "name": item.name,
+            "product_id": item.product_id,
+            "quantity": item.quantity,
+            "price": item.price
+        }
+        for item in items
+    ])
+    await db.run_sync(update_order_totals, [order_id])
+
+
+def claim_nearby_drivers(db, Driver, DriverClaim, order):
+    """Create system claims for the drivers near the order. Returns the push messages to send."""
+    nearby_drivers = get_nearby_drivers(db, Driver, order)
+    if not nearby_drivers:
+        return []
+
+    messages = [
+        build_push_message(driver.user.push_token, "Order Claim", "A new order has been created")
+        for driver in nearby_drivers
+        if driver.user and driver.user.push_token
+    ]
+
+    # One executemany for the whole fan-out; the claim ids are never needed here
+    db.execute(insert(DriverClaim), [
+        {
+            "driver_id": driver.id,
+            "order_id": order.id,
+            "claim_type": "system",
+            "status": "pending"
+        }
+        for driver in nearby_drivers
+    ])
+    db.commit()
+    return messages
+
+
+async def send_claim_pushes(messages):
+    if not messages:
+        return
+    try:
+        await push_dispatcher.send(messages)
+    except Exception as e:
+        logger.error(e)
 
 
 async def create_driver_claims(db, Driver, DriverClaim, order):
+    # The sync session work runs on a worker thread; only the push goes out on the loop
+    messages = await asyncio.to_thread(claim_nearby_drivers, db, Driver, DriverClaim, order)
+    await send_claim_pushes(messages)
+
+
+def notify_order_created(order_id):
+    """Background task: tell the customer their order was created."""
+    db = SessionLocal()
+    try:
+        order = db.query(Order).filter(Order.id == order_id).first()
+        if not order:
+            return
+        notify_user(
+            db,
+            order.user_id,
+            f"Order #{order.id} is created and is being processed",
+            'Order Created',
+            'Order',
+            order.id
+        )
+        db.commit()
+    finally:
+        db.close()
 
-        drivers = db.query(Driver).all()
-        nearby_drivers = get_nearby_drivers(order, drivers)
-
-        for driver in nearby_drivers:
-            claim = DriverClaim(
-                driver_id=driver.id,
-                order_id=order.id,
-                claim_type="system",
-                status="pending"
-            )
-            db.add(claim)
-            try:
-                if driver.user.push_token:
-                    await send_push_notification(
-                        driver.user.push_token,
-                        "Order Claim",
-                        "A new order has been created"
-                    )
-            except Exception as e:
-                logger.error(e)        
 
+def claim_drivers_for_order(order_id):
+    db = SessionLocal()
+    try:
+        order = db.query(Order).filter(Order.id == order_id).first()
+        if not order:
+            return []
+        return claim_nearby_drivers(db, Driver, DriverClaim, order)
+    finally:
+        db.close()
 
-        db.commit()
+
+async def dispatch_driver_claims(order_id):
+    """Background task: create system claims for, and push to, nearby drivers."""
+    messages = await asyncio.to_thread(claim_drivers_for_order, order_id)
+    await send_claim_pushes(messages)
 
 
 def create_payment_intent(payload, user_id, order_id, amount_cents):
@@ -77,12 +136,7 @@ def create_payment_intent(payload, user_id, order_id, amount_cents):
     )
 
 
-def initialize_paystack_transaction(payload, user_id, order_id, amount_cents,reference):
-    headers = {
-        "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-        "Content-Type": "application/json"
-    }
-
+async def initialize_paystack_transaction(payload, user_id, order_id, amount_cents,reference):
     data = {
         "email": payload.email,
         "amount": amount_cents,  # Paystack expects amount in cents
@@ -99,17 +153,7 @@ def initialize_paystack_transaction(payload, user_id, order_id, amount_cents,ref
   
     }
 
-    response = requests.post(settings.PAYSTACK_ENDPOINT, json=data, headers=headers)
-
-    if response.status_code != 200:
-        raise Exception(f"Paystack init failed: {response.json().get('message')}")
+    return await paystack_client.initialize_transaction(data)
 
-    return response.json()["data"]  # includes payment_url and access_code
-
-def verify_paystack_transaction(reference: str):
-    headers = {
-        "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}"
-    }
-    url = f"{settings.PAYSTACK_VERIFY}{reference}"
-    response = requests.get(url, headers=headers)
-    return response.json()
\ No newline at end of file
+async def verify_paystack_transaction(reference: str):
+    return await paystack_client.verify_transaction(reference)
\ No newline at end of file
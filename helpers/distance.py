@@ -1,5 +1,10 @@
-from math import radians, sin, cos, sqrt, atan2
-from typing import Dict
+from math import radians, sin, cos, sqrt, atan2, asin
+from typing import Dict, Tuple
+
+import numpy as np
+
+R_KM = 6371.0  # Earth's radius in kilometers
+
 
 def distance_between(start: Dict[str, float], end: Dict[str, float]) -> float:
     """
@@ -21,12 +26,64 @@ def distance_between(start: Dict[str, float], end: Dict[str, float]) -> float:
     except (KeyError, TypeError, ValueError):
         raise ValueError("Both `start` and `end` must contain valid 'lat' and 'lng' float values.")
 
-    R_km = 6371.0  # Earth's radius in kilometers
-
     dlat = radians(lat2 - lat1)
     dlon = radians(lon2 - lon1)
 
     a = sin(dlat / 2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2)**2
     c = 2 * atan2(sqrt(a), sqrt(1 - a))
 
-    return round(R_km * c, 2)
+    return round(R_KM * c, 2)
+
+
+def haversine_km(start: Tuple[float, float], end: Tuple[float, float]) -> float:
+    """
+    Fast scalar path: great-circle distance between two (lat, lng) tuples.
+
+    No validation or rounding is done, so callers must pass floats.
+
+    Returns:
+        float: Distance in kilometers.
+    """
+    lat1, lon1 = radians(start[0]), radians(start[1])
+    lat2, lon2 = radians(end[0]), radians(end[1])
+    a = sin((lat2 - lat1) / 2)**2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2)**2
+    return 2 * R_KM * asin(min(1.0, sqrt(a)))
+
+
+def distances_from(origin: Tuple[float, float], points) -> np.ndarray:
+    """
+    One-to-many great-circle distances.
+
+    Args:
+        origin (tuple): A (lat, lng) pair in decimal degrees.
+        points: An (N, 2) array-like of (lat, lng) pairs in decimal degrees.
+
+    Returns:
+        np.ndarray: N distances in kilometers.
+    """
+    points = np.radians(np.asarray(points, dtype=float).reshape(-1, 2))
+    lat1, lon1 = np.radians(origin[0]), np.radians(origin[1])
+    lat2, lon2 = points[:, 0], points[:, 1]
+
+    a = np.sin((lat2 - lat1) / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2)**2
+    return 2 * R_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def pairwise_distances(starts, ends) -> np.ndarray:
+    """
+    Many-to-many great-circle distances.
+
+    Args:
+        starts: An (N, 2) array-like of (lat, lng) pairs in decimal degrees.
+        ends: An (M, 2) array-like of (lat, lng) pairs in decimal degrees.
+
+    Returns:
+        np.ndarray: An (N, M) matrix of distances in kilometers.
+    """
+    starts = np.radians(np.asarray(starts, dtype=float).reshape(-1, 2))
+    ends = np.radians(np.asarray(ends, dtype=float).reshape(-1, 2))
+    lat1, lon1 = starts[:, 0:1], starts[:, 1:2]
+    lat2, lon2 = ends[:, 0], ends[:, 1]
+
+    a = np.sin((lat2 - lat1) / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2)**2
+    return 2 * R_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
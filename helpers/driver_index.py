@@ -0,0 +1,146 @@
+import threading
+from collections import defaultdict
+from math import cos, floor, radians
+
+from helpers.distance import distances_from
+
+KM_PER_DEGREE_LAT = 111.32
+
+
+class DriverGridIndex:
+    """
+    In-process spatial index of drivers that can take new orders.
+
+    Drivers are bucketed into a uniform lat/lng grid so radius lookups only
+    look at the cells that overlap the search circle instead of every driver.
+    Only drivers that are active, available and have a known position are
+    kept in the index. Drivers that are eligible but have no position yet are
+    remembered, so their first ping adds them.
+    """
+
+    def __init__(self, cell_size_deg: float = 0.1):
+        self.cell_size_deg = cell_size_deg
+        self._cells = defaultdict(dict)  # (row, col) -> {driver_id: (lat, lng)}
+        self._positions = {}  # driver_id -> (row, col)
+        self._eligible = set()  # active, available drivers, with or without a position
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _cell_for(self, lat: float, lng: float):
+        return (floor(lat / self.cell_size_deg), floor(lng / self.cell_size_deg))
+
+    def _remove_locked(self, driver_id: int):
+        cell = self._positions.pop(driver_id, None)
+        if cell is None:
+            return
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.pop(driver_id, None)
+            if not bucket:
+                del self._cells[cell]
+
+    def upsert(self, driver_id: int, lat: float, lng: float):
+        cell = self._cell_for(lat, lng)
+        with self._lock:
+            self._remove_locked(driver_id)
+            self._eligible.add(driver_id)
+            self._cells[cell][driver_id] = (lat, lng)
+            self._positions[driver_id] = cell
+
+    def move(self, driver_id: int, lat: float, lng: float):
+        """Update the position of an eligible driver, adding it if it had none; others are ignored."""
+        cell = self._cell_for(lat, lng)
+        with self._lock:
+            if driver_id not in self._eligible:
+                return
+            self._remove_locked(driver_id)
+            self._cells[cell][driver_id] = (lat, lng)
+            self._positions[driver_id] = cell
+
+    def remove(self, driver_id: int):
+        with self._lock:
+            self._eligible.discard(driver_id)
+            self._remove_locked(driver_id)
+
+    def sync(self, driver):
+        """
+        Add, move or drop a driver depending on its current state.
+
+        Pass the driver through `location_buffer.overlay` first so a position
+        that has not been flushed yet is not replaced by the stored one.
+        """
+        if not (driver.is_active and driver.status == "available"):
+            self.remove(driver.id)
+            return
+        if driver.latitude is not None and driver.longitude is not None:
+            self.upsert(driver.id, driver.latitude, driver.longitude)
+            return
+        with self._lock:
+            self._remove_locked(driver.id)
+            self._eligible.add(driver.id)
+
+    def load(self, drivers):
+        """Replace the index contents with the given drivers."""
+        with self._lock:
+            self._cells.clear()
+            self._positions.clear()
+            self._eligible.clear()
+        for driver in drivers:
+            self.sync(driver)
+        self._loaded = True
+
+    def ensure_loaded(self, db, Driver, overlay=None):
+        """
+        Populate the index from the database the first time it is used.
+
+        `overlay` is applied to every loaded driver before it is indexed; pass
+        `location_buffer.overlay` so buffered positions win over stored ones.
+        """
+        if self._loaded:
+            return
+        drivers = db.query(Driver).filter(Driver.is_active == True, Driver.status == "available").all()
+        if overlay is not None:
+            drivers = [overlay(driver) for driver in drivers]
+        self.load(drivers)
+
+    def query_radius(self, lat: float, lng: float, radius_km: float):
+        """
+        Find indexed drivers within `radius_km` of a point.
+
+        Returns:
+            list of tuples: (driver_id, distance) sorted by distance ascending.
+        """
+        lat_span = radius_km / KM_PER_DEGREE_LAT
+        # Clamp the cosine so lookups near the poles don't explode the span.
+        lng_span = radius_km / (KM_PER_DEGREE_LAT * max(cos(radians(lat)), 0.01))
+        min_row, min_col = self._cell_for(lat - lat_span, lng - lng_span)
+        max_row, max_col = self._cell_for(lat + lat_span, lng + lng_span)
+
+        with self._lock:
+            candidates = []
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    bucket = self._cells.get((row, col))
+                    if bucket:
+                        candidates.extend(bucket.items())
+
+        if not candidates:
+            return []
+
+        distances = distances_from((lat, lng), [position for _, position in candidates])
+        nearby = [
+            (driver_id, round(float(distance), 2))
+            for (driver_id, _), distance in zip(candidates, distances)
+            if distance <= radius_km
+        ]
+        nearby.sort(key=lambda pair: pair[1])
+        return nearby
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, driver_id):
+        return driver_id in self._positions
+
+
+driver_index = DriverGridIndex()
@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from loguru import logger
+from PIL import Image, ImageOps
+
+from core.config import settings
+
+# Longest edge in pixels for each derivative served by `get_image?size=`
+IMAGE_SIZES = {
+    "thumbnail": 160,
+    "card": 480,
+    "full": 1200,
+}
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Room for the other form fields and the multipart boundaries around the image
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+# `<sha256>.<ext>` originals and their `<sha256>_<size>.jpg` derivatives never change
+CONTENT_ADDRESSED = re.compile(r"^[0-9a-f]{64}(_(%s))?\.[a-z0-9]{1,5}$" % "|".join(IMAGE_SIZES))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def is_content_addressed(image_filename: str) -> bool:
+    return CONTENT_ADDRESSED.match(image_filename) is not None
+
+
+def _upload_extension(filename: Optional[str]) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if re.fullmatch(r"\.[a-z0-9]{1,5}", ext) else ".bin"
+
+
+class UploadLimitRoute(APIRoute):
+    """
+    Route class that turns away oversized multipart bodies up front.
+
+    Starlette spools the whole form before the endpoint runs, so a cap in
+    the endpoint only applies once the upload has been received. This checks
+    the declared Content-Length against MAX_IMAGE_UPLOAD_BYTES (plus room for
+    the other fields) and answers 413 before the form is parsed.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def limited_handler(request: Request) -> Response:
+            if request.headers.get("content-type", "").startswith("multipart/form-data"):
+                content_length = request.headers.get("content-length", "")
+                limit = settings.MAX_IMAGE_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD
+                if content_length.isdigit() and int(content_length) > limit:
+                    raise HTTPException(status_code=413, detail=f"Request body exceeds {limit} bytes")
+            return await handler(request)
+
+        return limited_handler
+
+
+async def save_upload(upload: UploadFile, dest_dir: str, max_bytes: Optional[int] = None) -> str:
+    """
+    Stream an upload to disk under its content hash.
+
+    The body is copied in chunks into a temp file in `dest_dir` (so the final
+    rename is atomic), hashed along the way and rejected with 413 once it
+    grows past `max_bytes` (MAX_IMAGE_UPLOAD_BYTES by default). Re-uploading
+    the same bytes yields the same name.
+
+    By the time this runs Starlette has already buffered the upload, so this
+    cap only catches bodies sent without a usable Content-Length; routes on
+    `UploadLimitRoute` reject declared oversized bodies before parsing.
+
+    Returns:
+        str: The stored filename, `<sha256>.<ext>`.
+    """
+    max_bytes = max_bytes or settings.MAX_IMAGE_UPLOAD_BYTES
+    await run_in_threadpool(os.makedirs, dest_dir, exist_ok=True)
+    fd, tmp_path = await run_in_threadpool(tempfile.mkstemp, dir=dest_dir, prefix=".upload-", suffix=".tmp")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, "wb") as buffer:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Image exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                await run_in_threadpool(buffer.write, chunk)
+        filename = f"{digest.hexdigest()}{_upload_extension(upload.filename)}"
+        await run_in_threadpool(os.replace, tmp_path, os.path.join(dest_dir, filename))
+        return filename
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def derivative_filename(image_filename: str, size: str) -> str:
+    stem, _ = os.path.splitext(image_filename)
+    return f"{stem}_{size}.jpg"
+
+
+def is_derivative(image_filename: str) -> bool:
+    stem, ext = os.path.splitext(image_filename)
+    return ext == ".jpg" and any(stem.endswith(f"_{size}") for size in IMAGE_SIZES)
+
+
+def generate_derivatives(source_path: str, dest_dir: Optional[str] = None) -> Dict[str, str]:
+    """
+    Write a resized JPEG for every entry in IMAGE_SIZES next to the source image.
+
+    Runs in a worker process, so it only takes and returns plain values.
+
+    Returns:
+        dict: size name -> derivative filename.
+    """
+    dest_dir = dest_dir or os.path.dirname(source_path)
+    image_filename = os.path.basename(source_path)
+    written = {}
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        for size, max_edge in IMAGE_SIZES.items():
+            derivative = image.copy()
+            derivative.thumbnail((max_edge, max_edge), Image.LANCZOS)  # never upscales
+            filename = derivative_filename(image_filename, size)
+            tmp_path = os.path.join(dest_dir, f".{filename}.tmp")
+            derivative.save(tmp_path, "JPEG", quality=82, optimize=True, progressive=True)
+            os.replace(tmp_path, os.path.join(dest_dir, filename))
+            written[size] = filename
+    return written
+
+
+def get_image_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _pool
+
+
+def shutdown_image_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+
+
+async def create_derivatives(source_path: str) -> Dict[str, str]:
+    """Generate derivatives on the process pool. Failures are logged and the original is kept."""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_image_pool(), generate_derivatives, source_path)
+    except Exception as e:
+        logger.error(f"Could not create derivatives for {source_path}: {e!r}")
+        return {}
+
+
+def backfill_derivatives(image_dir: str, dest_dir: Optional[str] = None) -> int:
+    """Create derivatives for every original image in `image_dir`. Returns the number processed."""
+    sources = [
+        os.path.join(image_dir, filename)
+        for filename in sorted(os.listdir(image_dir))
+        if os.path.isfile(os.path.join(image_dir, filename))
+        and not filename.startswith(".")
+        and not is_derivative(filename)
+    ]
+    processed = 0
+    pool = get_image_pool()
+    futures = [(path, pool.submit(generate_derivatives, path, dest_dir)) for path in sources]
+    for path, future in futures:
+        try:
+            future.result()
+            processed += 1
+        except Exception as e:
+            logger.error(f"Could not create derivatives for {path}: {e!r}")
+    return processed
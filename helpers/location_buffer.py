@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from core.config import settings
+from db.models.driver import Driver
+from db.session import AsyncSessionLocal
+from helpers.driver_index import driver_index
+
+_drivers = Driver.__table__
+
+_update_position = (
+    update(_drivers)
+    .where(_drivers.c.id == bindparam("driver_id"))
+    .values(latitude=bindparam("lat"), longitude=bindparam("lng"))
+)
+
+
+class LocationBuffer:
+    """
+    Write-behind store of the latest driver positions.
+
+    GPS pings only replace the driver's entry in memory and move it in the
+    driver index. Every `flush_interval` seconds the positions that changed
+    since the last flush are written to `drivers` in one executemany, so a
+    driver pinging every few seconds costs at most one row update per
+    interval. Reads overlay the buffered position on the stored one.
+    """
+
+    def __init__(self, flush_interval: float = settings.LOCATION_FLUSH_INTERVAL, session_factory=AsyncSessionLocal):
+        self.flush_interval = flush_interval
+        self.session_factory = session_factory
+        self._latest: Dict[int, Tuple[float, float]] = {}
+        self._pending: Dict[int, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def __contains__(self, driver_id: int) -> bool:
+        return driver_id in self._latest
+
+    def record(self, driver_id: int, lat: float, lng: float):
+        with self._lock:
+            self._latest[driver_id] = self._pending[driver_id] = (lat, lng)
+        driver_index.move(driver_id, lat, lng)
+
+    def get(self, driver_id: int) -> Optional[Tuple[float, float]]:
+        return self._latest.get(driver_id)
+
+    def discard(self, driver_id: int):
+        with self._lock:
+            self._latest.pop(driver_id, None)
+            self._pending.pop(driver_id, None)
+
+    def overlay(self, driver):
+        """Show the buffered position on a loaded Driver without marking it dirty."""
+        position = self._latest.get(driver.id) if driver is not None else None
+        if position is not None:
+            set_committed_value(driver, "latitude", position[0])
+            set_committed_value(driver, "longitude", position[1])
+        return driver
+
+    async def flush(self) -> int:
+        """Write the positions recorded since the last flush. Returns the number of drivers written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            async with self.session_factory() as db:
+                await db.execute(_update_position, [
+                    {"driver_id": driver_id, "lat": lat, "lng": lng}
+                    for driver_id, (lat, lng) in pending.items()
+                ])
+                await db.commit()
+        except Exception as e:
+            # Keep them for the next flush unless a newer fix has arrived meanwhile
+            with self._lock:
+                for driver_id, position in pending.items():
+                    self._pending.setdefault(driver_id, position)
+            logger.error(f"Could not flush {len(pending)} driver locations: {e!r}")
+            return 0
+        return len(pending)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="location-flush")
+
+    async def stop(self):
+        """Stop the periodic flush and write whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+
+location_buffer = LocationBuffer()
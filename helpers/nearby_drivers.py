@@ -1,29 +1,41 @@
-from helpers import distance_between
+from sqlalchemy.orm import joinedload
 
-def get_nearby_drivers(order, drivers, radius_km=20):
+from helpers.driver_index import driver_index
+from helpers.location_buffer import location_buffer
+
+def get_nearby_drivers(db, Driver, order, radius_km=20):
     """
-    Filter drivers who are within a given radius (in km) of the order's destination.
+    Find available drivers who are within a given radius (in km) of the order's destination.
+
+    Candidates come from the in-process driver grid index, so only the drivers
+    that are actually nearby are loaded from the database.
 
     Args:
+        db: The database session.
+        Driver: The Driver model.
         order: An object with destination_latitude and destination_longitude attributes.
-        drivers: A list of driver objects, each with latitude and longitude.
         radius_km (float): The distance radius in kilometers.
 
     Returns:
-        list of tuples: (driver, distance) sorted by distance ascending.
+        list: Driver objects sorted by distance ascending.
     """
-    nearby = []
-    for driver in drivers:
-        if all([
-            driver.latitude is not None,
-            driver.longitude is not None,
-            order.destination_latitude is not None,
-            order.destination_longitude is not None
-        ]):
-            distance = distance_between(
-                {'lat': driver.latitude, 'lng': driver.longitude},
-                {'lat': order.destination_latitude, 'lng': order.destination_longitude}
-            ) or 0
-            if distance <= radius_km:
-                nearby.append(driver)
-    return nearby
+    if order.destination_latitude is None or order.destination_longitude is None:
+        return []
+
+    driver_index.ensure_loaded(db, Driver, overlay=location_buffer.overlay)
+    matches = driver_index.query_radius(
+        order.destination_latitude, order.destination_longitude, radius_km
+    )
+    if not matches:
+        return []
+
+    # Re-check state against the table so a stale index entry never leaks through.
+    drivers = {
+        driver.id: driver
+        for driver in db.query(Driver).options(joinedload(Driver.user)).filter(
+            Driver.id.in_([driver_id for driver_id, _ in matches]),
+            Driver.is_active == True,
+            Driver.status == "available",
+        )
+    }
+    return [drivers[driver_id] for driver_id, _ in matches if driver_id in drivers]
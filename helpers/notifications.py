@@ -1,9 +1,14 @@
+import asyncio
+from typing import List, Optional
+
 import httpx
 import loguru
 
+from core.config import settings
 
-async def send_push_notification(push_token: str, title: str, body: str):
-    message = {
+
+def build_push_message(push_token: str, title: str, body: str) -> dict:
+    return {
         "to": push_token,
         "sound": "default",
         "title": title,
@@ -11,6 +16,92 @@ async def send_push_notification(push_token: str, title: str, body: str):
         "data": {"extra": "data"},
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post("https://exp.host/--/api/v2/push/send", json=message)
-        loguru.logger.info(f"Expo response: {response.json()}")
\ No newline at end of file
+
+class PushDispatcher:
+    """
+    Long-lived Expo push sender.
+
+    Owns a single pooled `httpx.AsyncClient` for the lifetime of the app,
+    splits messages into Expo's multi-message batch requests and sends the
+    batches concurrently, bounded by `max_concurrency`.
+    """
+
+    def __init__(
+        self,
+        endpoint: str = settings.EXPO_PUSH_ENDPOINT,
+        batch_size: int = settings.PUSH_BATCH_SIZE,
+        max_concurrency: int = settings.PUSH_MAX_CONCURRENCY,
+        timeout: float = settings.PUSH_TIMEOUT_SECONDS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.endpoint = endpoint
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def start(self):
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            ),
+            transport=self._transport,
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._semaphore = None
+
+    async def _send_chunk(self, chunk: List[dict]) -> List[dict]:
+        async with self._semaphore:
+            response = await self._client.post(self.endpoint, json=chunk)
+        response.raise_for_status()
+        tickets = response.json().get("data", [])
+        loguru.logger.info(f"Expo response: {len(tickets)} tickets for {len(chunk)} messages")
+        return tickets
+
+    async def send(self, messages: List[dict]) -> List[dict]:
+        """
+        Send push messages in batches.
+
+        Returns:
+            list: The Expo push tickets of every batch that succeeded.
+            Failed batches are logged and skipped.
+        """
+        if not messages:
+            return []
+        # Started lazily as well, so callers outside the app lifespan still work.
+        await self.start()
+
+        chunks = [
+            messages[i:i + self.batch_size]
+            for i in range(0, len(messages), self.batch_size)
+        ]
+        results = await asyncio.gather(
+            *(self._send_chunk(chunk) for chunk in chunks),
+            return_exceptions=True,
+        )
+
+        tickets = []
+        for result in results:
+            if isinstance(result, Exception):
+                loguru.logger.error(f"Expo push batch failed: {result!r}")
+            else:
+                tickets.extend(result)
+        return tickets
+
+
+push_dispatcher = PushDispatcher()
+
+
+async def send_push_notification(push_token: str, title: str, body: str):
+    return await push_dispatcher.send([build_push_message(push_token, title, body)])
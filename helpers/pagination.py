@@ -0,0 +1,69 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, literal, or_, String
+
+
+def encode_cursor(created: datetime, id: int) -> str:
+    raw = json.dumps([created.isoformat(), id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created, id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _stored_datetime(value: datetime) -> str:
+    # `created` is filled by CURRENT_TIMESTAMP, which SQLite stores as text with
+    # second precision. Bind the cursor in the same text form so the comparison
+    # is exact and can still walk the (created, id) index.
+    if value.microsecond:
+        return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _after_cursor(model, cursor: str):
+    created, id = decode_cursor(cursor)
+    created = literal(_stored_datetime(created), String)
+    return or_(
+        model.created < created,
+        and_(model.created == created, model.id < id),
+    )
+
+
+def _page(rows, limit: int):
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].created, rows[-1].id)
+    return rows, None
+
+
+def keyset_paginate(query, model, cursor: Optional[str], limit: int):
+    """
+    Page through `query` newest first using a keyset on (created, id).
+
+    Returns:
+        tuple: (rows, next_cursor) where next_cursor is None on the last page.
+    """
+    if cursor:
+        query = query.filter(_after_cursor(model, cursor))
+
+    rows = query.order_by(model.created.desc(), model.id.desc()).limit(limit + 1).all()
+    return _page(rows, limit)
+
+
+async def keyset_paginate_async(db, statement, model, cursor: Optional[str], limit: int):
+    """`keyset_paginate` for a `select()` run on an AsyncSession."""
+    if cursor:
+        statement = statement.where(_after_cursor(model, cursor))
+
+    result = await db.scalars(statement.order_by(model.created.desc(), model.id.desc()).limit(limit + 1))
+    return _page(result.all(), limit)
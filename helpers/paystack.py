@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+import hmac
+import random
+from typing import Optional
+
+import httpx
+from loguru import logger
+
+from core.config import settings
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class PaystackError(Exception):
+    pass
+
+
+def _error_message(response: httpx.Response) -> str:
+    # Proxies and outages answer with HTML or an empty body rather than Paystack's JSON
+    try:
+        return response.json().get("message") or response.text
+    except ValueError:
+        return response.text or f"HTTP {response.status_code}"
+
+
+def verify_webhook_signature(body: bytes, signature: Optional[str], secret_key: str = settings.PAYSTACK_SECRET_KEY) -> bool:
+    """Check the `x-paystack-signature` header: an HMAC-SHA512 of the raw body keyed with the secret key."""
+    if not signature:
+        return False
+    expected = hmac.new(secret_key.encode(), body, hashlib.sha512).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+class PaystackClient:
+    """
+    Async Paystack API client.
+
+    A single pooled `httpx.AsyncClient` with keep-alive is shared for the app
+    lifespan. Requests use explicit connect/read timeouts and are retried with
+    full-jitter exponential backoff. Only failures where the request never
+    reached Paystack are retried for the non-idempotent initialize call.
+    """
+
+    def __init__(
+        self,
+        secret_key: str = settings.PAYSTACK_SECRET_KEY,
+        initialize_url: str = settings.PAYSTACK_ENDPOINT,
+        verify_url: str = settings.PAYSTACK_VERIFY,
+        connect_timeout: float = settings.PAYSTACK_CONNECT_TIMEOUT,
+        read_timeout: float = settings.PAYSTACK_READ_TIMEOUT,
+        max_retries: int = settings.PAYSTACK_MAX_RETRIES,
+        pool_size: int = settings.PAYSTACK_POOL_SIZE,
+        backoff: float = 0.25,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.secret_key = secret_key
+        self.initialize_url = initialize_url
+        self.verify_url = verify_url
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=30.0,
+        )
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self._timeout,
+                limits=self._limits,
+                transport=self._transport,
+                headers={"Authorization": f"Bearer {self.secret_key}"},
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+
+    async def _request(self, method: str, url: str, idempotent: bool, **kwargs) -> httpx.Response:
+        await self.start()
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await self._client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                if last_attempt:
+                    raise PaystackError(f"Paystack unreachable: {e!r}")
+                reason = repr(e)
+            except httpx.TransportError as e:
+                if last_attempt or not idempotent:
+                    raise PaystackError(f"Paystack request failed: {e!r}")
+                reason = repr(e)
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES or last_attempt or not idempotent:
+                    return response
+                reason = f"HTTP {response.status_code}"
+
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+            logger.warning(f"Paystack {method} {url} failed ({reason}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def initialize_transaction(self, data: dict) -> dict:
+        response = await self._request("POST", self.initialize_url, idempotent=False, json=data)
+        if response.status_code != 200:
+            raise PaystackError(f"Paystack init failed: {_error_message(response)}")
+        return response.json()["data"]  # includes payment_url and access_code
+
+    async def verify_transaction(self, reference: str) -> dict:
+        response = await self._request("GET", f"{self.verify_url}{reference}", idempotent=True)
+        try:
+            return response.json()
+        except ValueError:
+            raise PaystackError(f"Paystack verify failed: {_error_message(response)}")
+
+
+paystack_client = PaystackClient()
@@ -1,10 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from api.endpoints import orders, suppliers, users, product, auth, category, cart, seed, driver, driver_claim, notification, advert
-from db.base import Base
-from db.session import engine
+from db.session import engine, async_engine, log_sqlite_pragmas
+from db.migrations import prepare_database
 from fastapi.middleware.cors import CORSMiddleware
-
-app = FastAPI()
+from core.tasks import task_queue
+from core.security import password_hasher
+from helpers import push_dispatcher, paystack_client, location_buffer
+from helpers.images import shutdown_image_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Once per worker at startup, not at import; concurrent workers serialize on the write lock
+    prepare_database(engine)
+    log_sqlite_pragmas(engine)
+    await push_dispatcher.start()
+    await paystack_client.start()
+    task_queue.start()
+    location_buffer.start()
+    yield
+    await location_buffer.stop()
+    await task_queue.stop()
+    await paystack_client.close()
+    await push_dispatcher.close()
+    shutdown_image_pool()
+    password_hasher.shutdown()
+    await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = ['*']
 
@@ -36,6 +61,3 @@ app.include_router(notification.router, prefix="/notifications", tags=["notifica
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Fruit-Pack Platform API"}
-
-# Run this once in your main.py or a setup script
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
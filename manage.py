@@ -0,0 +1,57 @@
+"""Maintenance commands, e.g. `python manage.py backfill-totals`."""
+import argparse
+
+from core.config import settings
+from db.migrations import prepare_database
+from db.models import backfill_order_totals
+from db.session import SessionLocal, engine
+from helpers.images import backfill_derivatives, shutdown_image_pool
+
+
+def migrate(args):
+    applied = prepare_database(engine)
+    print(f"Applied migrations: {applied}" if applied else "Schema is up to date")
+
+
+def backfill_totals(args):
+    db = SessionLocal()
+    try:
+        updated = backfill_order_totals(db)
+    finally:
+        db.close()
+    print(f"Recomputed totals for {updated} orders")
+
+
+def backfill_images(args):
+    try:
+        processed = backfill_derivatives(args.dir, args.dest)
+    finally:
+        shutdown_image_pool()
+    print(f"Created derivatives for {processed} images")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fruit-Pack maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser(
+        "migrate", help="Create missing tables and apply pending schema migrations (indexes etc.)"
+    ).set_defaults(handler=migrate)
+
+    commands.add_parser(
+        "backfill-totals", help="Recompute the stored total of every order from its items"
+    ).set_defaults(handler=backfill_totals)
+
+    images = commands.add_parser(
+        "backfill-images", help="Create thumbnail/card/full derivatives for existing product images"
+    )
+    images.add_argument("--dir", default=settings.IMAGE_DIR, help="Directory holding the original images")
+    images.add_argument("--dest", default=None, help="Where to write derivatives (defaults to --dir)")
+    images.set_defaults(handler=backfill_images)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import List, Optional
 
 class NotificationBase(BaseModel):
     user_id: int
@@ -19,6 +20,20 @@ class NotificationRead(NotificationBase):
     class Config:
         orm_mode = True
 
+class NotificationPage(BaseModel):
+    items: List[NotificationRead]
+    next_cursor: Optional[str] = None
+
+class UnseenCount(BaseModel):
+    unseen: int
+
+class MarkSeenRequest(BaseModel):
+    ids: Optional[List[int]] = None  # None marks every unseen notification
+
+class MarkSeenResult(BaseModel):
+    updated: int
+    unseen: int
+
 class NotificationAlert(BaseModel):
     user_id: str
     title: str
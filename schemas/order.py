@@ -53,3 +53,7 @@ class OrderResponse(OrderBase):
 class OrderLocationUpdate(BaseModel):
     destination_latitude: Optional[float] = None
     destination_longitude: Optional[float] = None
+
+class OrderPage(BaseModel):
+    items: List[OrderResponse]
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to fetch the next page
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+import core.cache
+import db.models  # noqa: F401  (registers every model on Base.metadata)
+from core.auth import get_current_user, get_current_user_async
+from core.cache import CatalogCache
+from db.base import Base
+from db.migrations import run_migrations
+from db.models import User
+from db.session import get_async_db, get_db
+from main import app
+
+
+@pytest.fixture
+def database_path(tmp_path_factory):
+    # A file database so the sync and the aiosqlite engines see the same data
+    return tmp_path_factory.mktemp("db") / "test.db"
+
+
+@pytest.fixture
+def engine(database_path):
+    engine = create_engine(
+        f"sqlite:///{database_path}",
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def async_engine(engine, database_path):
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}", poolclass=NullPool)
+    yield async_engine
+    asyncio.run(async_engine.dispose())
+
+
+@pytest.fixture
+def db_session(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def user(db_session):
+    user = User(
+        email="customer@example.com",
+        full_name="John Doe",
+        username="customer",
+        hashed_password="not-a-real-hash",
+        role="customer",
+    )
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+@pytest.fixture
+def client(engine, async_engine, user, monkeypatch):
+    """A TestClient bound to the test database and authenticated as `user`."""
+    # Catalog versions restart with every test database, so start from an empty cache
+    monkeypatch.setattr(core.cache, "catalog_cache", CatalogCache())
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    def override_get_current_user():
+        db = Session()
+        try:
+            return db.get(User, user.id)
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    async def override_get_current_user_async():
+        async with AsyncSessionLocal() as db:
+            return await db.get(User, user.id)
+
+    app.dependency_overrides[get_current_user] = override_get_current_user
+    app.dependency_overrides[get_current_user_async] = override_get_current_user_async
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+class QueryCounter:
+    """Counts the SQL statements an engine executes, e.g. per request."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def reset(self):
+        self.statements.clear()
+
+    def remove(self):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+@pytest.fixture
+def query_counter(engine):
+    counter = QueryCounter(engine)
+    yield counter
+    counter.remove()
@@ -0,0 +1,61 @@
+"""A minimal in-process stand-in for the Paystack transaction API."""
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def create_fake_paystack(fail_times: int = 0):
+    """
+    Build a fake Paystack app.
+
+    The first `fail_times` requests answer with a 503 so retry paths can be
+    exercised. Initialized transactions are kept in `app.state.transactions`.
+    """
+    app = FastAPI()
+    app.state.transactions = {}
+    app.state.requests = 0
+    app.state.failures_left = fail_times
+
+    @app.middleware("http")
+    async def flaky(request: Request, call_next):
+        app.state.requests += 1
+        if app.state.failures_left > 0:
+            app.state.failures_left -= 1
+            return JSONResponse({"status": False, "message": "Service unavailable"}, status_code=503)
+        return await call_next(request)
+
+    @app.post("/transaction/initialize")
+    async def initialize(request: Request):
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return JSONResponse({"status": False, "message": "Invalid key"}, status_code=401)
+        data = await request.json()
+        reference = data["reference"]
+        if reference in app.state.transactions:
+            return JSONResponse({"status": False, "message": "Duplicate Transaction Reference"}, status_code=400)
+        app.state.transactions[reference] = data
+        return {
+            "status": True,
+            "message": "Authorization URL created",
+            "data": {
+                "authorization_url": f"https://checkout.paystack.test/{reference}",
+                "access_code": f"access-{reference}",
+                "reference": reference,
+            },
+        }
+
+    @app.get("/transaction/verify/{reference}")
+    async def verify(reference: str):
+        data = app.state.transactions.get(reference)
+        if data is None:
+            return JSONResponse({"status": False, "message": "Transaction reference not found"}, status_code=400)
+        return {
+            "status": True,
+            "message": "Verification successful",
+            "data": {
+                "status": "success",
+                "reference": reference,
+                "amount": data["amount"],
+                "metadata": data.get("metadata", {}),
+            },
+        }
+
+    return app
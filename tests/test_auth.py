@@ -0,0 +1,75 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.auth import PrincipalCache, get_current_user, get_current_user_async, principal_cache
+from core.security import create_access_token
+from db.models import User
+from main import app
+from tests.conftest import QueryCounter
+
+
+def test_cached_principal_skips_users_query(db_session, user, query_counter):
+    principal_cache.clear()
+    token = create_access_token({"sub": str(user.id)})
+
+    assert get_current_user(token, db_session).id == user.id
+    db_session.expunge_all()
+    query_counter.reset()
+
+    cached = get_current_user(token, db_session)
+
+    assert cached.username == "customer"
+    assert query_counter.count == 0
+
+    # The merged copy is attached to the session, so writes through it persist
+    cached.push_token = "ExponentPushToken[abc]"
+    db_session.commit()
+    principal_cache.invalidate(user.id)
+    assert db_session.query(User).filter(User.id == user.id).one().push_token == "ExponentPushToken[abc]"
+
+
+def test_async_principal_uses_the_async_session_and_cache(async_engine, user):
+    principal_cache.clear()
+    token = create_access_token({"sub": str(user.id)})
+
+    async def resolve():
+        async with AsyncSession(async_engine) as db:
+            return (await get_current_user_async(token, db)).username
+
+    counter = QueryCounter(async_engine.sync_engine)
+    assert asyncio.run(resolve()) == "customer"
+    assert counter.count == 1
+    assert asyncio.run(resolve()) == "customer"
+    counter.remove()
+    assert counter.count == 1
+
+
+def test_async_endpoints_never_touch_the_sync_engine(client, engine, user):
+    principal_cache.clear()
+    del app.dependency_overrides[get_current_user_async]
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+    counter = QueryCounter(engine)
+    response = client.get("/notifications/unseen-count", headers=headers)
+    counter.remove()
+
+    assert response.json() == {"unseen": 0}
+    assert counter.count == 0
+
+
+def test_cache_is_bounded_and_counts_hits():
+    cache = PrincipalCache(maxsize=2, ttl=60)
+    for user_id in (1, 2, 3):
+        cache.put(User(id=user_id, email=f"{user_id}@example.com", full_name="x", username=str(user_id), hashed_password="x"))
+
+    assert cache.get(1) is None
+    assert cache.get(3).username == "3"
+    assert cache.stats() == {"size": 2, "hits": 1, "misses": 1}
+
+
+def test_expired_entries_are_misses():
+    cache = PrincipalCache(maxsize=10, ttl=-1)
+    cache.put(User(id=1, email="a@example.com", full_name="x", username="a", hashed_password="x"))
+
+    assert cache.get(1) is None
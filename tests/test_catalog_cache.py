@@ -0,0 +1,78 @@
+import threading
+import time
+
+from core.cache import CatalogCache
+from db.models import Category
+
+
+def test_concurrent_misses_build_once():
+    cache = CatalogCache()
+    builds = []
+
+    def build():
+        builds.append(1)
+        time.sleep(0.05)
+        return b"[]"
+
+    threads = [threading.Thread(target=cache.get_or_build, args=(("products", 0, 100), 0, build)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert cache.get_or_build(("products", 0, 100), 0, build) == b"[]"
+
+
+def test_bump_moves_the_shared_version_for_every_worker(db_session):
+    workers = [CatalogCache(), CatalogCache()]
+    version = workers[0].version(db_session)
+    workers[0].get_or_build(("categories",), version, lambda: b"[1]")
+    etag = workers[0].etag(("categories",), version)
+
+    workers[1].bump(db_session)
+    db_session.commit()
+
+    new_version = workers[0].version(db_session)
+    assert new_version == version + 1
+    assert workers[0].etag(("categories",), new_version) == workers[1].etag(("categories",), new_version) != etag
+    assert workers[0].get_or_build(("categories",), new_version, lambda: b"[2]") == b"[2]"
+
+
+def test_category_list_is_served_from_cache_until_a_write(client):
+    assert client.get("/categories/").json() == []
+
+    created = client.post("/categories/", json={"name": "ASAP", "icon": "⏱️"})
+    assert created.status_code == 200
+
+    assert [category["name"] for category in client.get("/categories/").json()] == ["ASAP"]
+
+
+def test_conditional_get_returns_304_until_catalog_changes(client, query_counter):
+    first = client.get("/suppliers/")
+    etag = first.headers["etag"]
+
+    query_counter.reset()
+    cached = client.get("/suppliers/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert not any("suppliers" in statement for statement in query_counter.statements)
+
+    client.post("/suppliers/", json={"name": "Green Valley", "contact_email": "hello@greenvalley.com"})
+    changed = client.get("/suppliers/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_writes_from_another_worker_invalidate_cached_lists(client, db_session):
+    first = client.get("/categories/")
+    assert first.json() == []
+
+    # Another worker adds a category: only the database row tells this one about it
+    db_session.add(Category(name="Citrus"))
+    CatalogCache().bump(db_session)
+    db_session.commit()
+
+    changed = client.get("/categories/", headers={"If-None-Match": first.headers["etag"]})
+    assert changed.status_code == 200
+    assert [category["name"] for category in changed.json()] == ["Citrus"]
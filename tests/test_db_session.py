@@ -0,0 +1,21 @@
+import pytest
+from sqlalchemy import create_engine
+
+from db.session import apply_sqlite_profile, log_sqlite_pragmas
+
+
+def test_performance_profile_is_applied_to_new_connections(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    apply_sqlite_profile(engine, "performance")
+
+    active = log_sqlite_pragmas(engine, "performance")
+
+    assert active["journal_mode"] == "wal"
+    assert active["synchronous"] == 1  # NORMAL
+    assert active["busy_timeout"] == 5000
+    engine.dispose()
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError):
+        apply_sqlite_profile(create_engine("sqlite://"), "turbo")
@@ -0,0 +1,26 @@
+import numpy as np
+
+from helpers.distance import distance_between, haversine_km, distances_from, pairwise_distances
+
+JOHANNESBURG = (-26.2041, 28.0473)
+PRETORIA = (-25.7479, 28.2293)
+CAPE_TOWN = (-33.9249, 18.4241)
+
+
+def test_batch_paths_match_scalar_distance():
+    expected = distance_between(
+        {'lat': JOHANNESBURG[0], 'lng': JOHANNESBURG[1]},
+        {'lat': PRETORIA[0], 'lng': PRETORIA[1]}
+    )
+
+    assert round(haversine_km(JOHANNESBURG, PRETORIA), 2) == expected
+    assert np.round(distances_from(JOHANNESBURG, [PRETORIA, JOHANNESBURG]), 2).tolist() == [expected, 0.0]
+
+
+def test_pairwise_distances_shape_and_symmetry():
+    points = [JOHANNESBURG, PRETORIA, CAPE_TOWN]
+    matrix = pairwise_distances(points, points)
+
+    assert matrix.shape == (3, 3)
+    assert np.allclose(matrix, matrix.T)
+    assert np.allclose(np.diag(matrix), 0)
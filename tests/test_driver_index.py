@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+from db.models import Driver, User
+from helpers.driver_index import DriverGridIndex
+from helpers.location_buffer import LocationBuffer
+
+
+def make_driver(id, lat, lng, status="available", is_active=True):
+    return SimpleNamespace(id=id, latitude=lat, longitude=lng, status=status, is_active=is_active)
+
+
+def test_query_radius_returns_nearby_drivers_sorted():
+    index = DriverGridIndex()
+    index.load([
+        make_driver(1, -26.2041, 28.0473),  # Johannesburg
+        make_driver(2, -26.1076, 28.0567),  # Sandton, ~11km away
+        make_driver(3, -33.9249, 18.4241),  # Cape Town
+    ])
+
+    matches = index.query_radius(-26.2041, 28.0473, 20)
+
+    assert [driver_id for driver_id, _ in matches] == [1, 2]
+    assert matches[0][1] == 0
+
+
+def test_sync_drops_unavailable_and_inactive_drivers():
+    index = DriverGridIndex()
+    index.sync(make_driver(1, -26.2041, 28.0473))
+    index.sync(make_driver(2, -26.2041, 28.0473))
+    assert len(index) == 2
+
+    index.sync(make_driver(1, -26.2041, 28.0473, status="busy"))
+    index.sync(make_driver(2, -26.2041, 28.0473, is_active=False))
+
+    assert len(index) == 0
+    assert index.query_radius(-26.2041, 28.0473, 20) == []
+
+
+def test_upsert_moves_driver_between_cells():
+    index = DriverGridIndex()
+    index.upsert(1, -26.2041, 28.0473)
+    index.upsert(1, -33.9249, 18.4241)
+
+    assert index.query_radius(-26.2041, 28.0473, 20) == []
+    assert [driver_id for driver_id, _ in index.query_radius(-33.9249, 18.4241, 5)] == [1]
+
+
+def test_move_only_updates_eligible_drivers():
+    index = DriverGridIndex()
+    index.upsert(1, -26.2041, 28.0473)
+    index.sync(make_driver(2, -26.2041, 28.0473, status="busy"))
+    index.sync(make_driver(3, None, None))  # available, but no position yet
+    for driver_id in (1, 2, 3, 4):
+        index.move(driver_id, -33.9249, 18.4241)  # busy or unknown drivers stay out
+
+    assert [driver_id for driver_id, _ in index.query_radius(-33.9249, 18.4241, 5)] == [1, 3]
+
+    index.remove(3)
+    index.move(3, -26.2041, 28.0473)
+    assert 3 not in index
+
+
+def test_ensure_loaded_prefers_buffered_positions(db_session):
+    driver = Driver(
+        user=User(email="d@example.com", full_name="Driver", username="d", hashed_password="not-a-real-hash"),
+        status="available",
+    )
+    db_session.add(driver)
+    db_session.commit()
+
+    buffer = LocationBuffer()
+    buffer.record(driver.id, -26.2041, 28.0473)  # not flushed, so the stored position is still empty
+
+    index = DriverGridIndex()
+    index.ensure_loaded(db_session, Driver, overlay=buffer.overlay)
+
+    assert [driver_id for driver_id, _ in index.query_radius(-26.2041, 28.0473, 1)] == [driver.id]
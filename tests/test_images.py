@@ -0,0 +1,123 @@
+import os
+
+from PIL import Image
+
+from helpers.images import IMAGE_SIZES, backfill_derivatives, generate_derivatives, is_derivative, shutdown_image_pool
+
+
+def test_derivatives_are_resized_and_never_upscaled(tmp_path):
+    source = tmp_path / "Mango_photo.png"
+    Image.new("RGBA", (2000, 1000), (255, 200, 0, 255)).save(source)
+
+    written = generate_derivatives(str(source))
+
+    assert set(written) == set(IMAGE_SIZES)
+    for size, filename in written.items():
+        with Image.open(tmp_path / filename) as derivative:
+            assert derivative.format == "JPEG"
+            assert max(derivative.size) == min(IMAGE_SIZES[size], 2000)
+
+
+def test_backfill_skips_existing_derivatives(tmp_path):
+    Image.new("RGB", (100, 100)).save(tmp_path / "Kiwi.jpg")
+    try:
+        assert backfill_derivatives(str(tmp_path)) == 1
+        assert backfill_derivatives(str(tmp_path)) == 1  # derivatives aren't treated as originals
+    finally:
+        shutdown_image_pool()
+
+    assert sorted(os.listdir(tmp_path)) == ["Kiwi.jpg", "Kiwi_card.jpg", "Kiwi_full.jpg", "Kiwi_thumbnail.jpg"]
+    assert all(is_derivative(name) for name in os.listdir(tmp_path) if name != "Kiwi.jpg")
+
+
+def test_uploads_are_content_addressed_and_served_immutable(client, db_session, tmp_path, monkeypatch):
+    from api.endpoints import product
+    from db.models import Supplier
+
+    monkeypatch.setattr(product, "IMAGE_DIR", str(tmp_path))
+    supplier = Supplier(name="FreshFruits Ltd")
+    db_session.add(supplier)
+    db_session.commit()
+
+    with open("assets/images/Orange.jpg", "rb") as f:
+        image_bytes = f.read()
+    form = {"name": "Orange", "supplier_id": str(supplier.id), "price": "30.5", "stock": "10", "unit": "kg"}
+    try:
+        first = client.post("/products/", data=form, files={"image": ("orange.JPG", image_bytes, "image/jpeg")})
+        second = client.post("/products/", data=form, files={"image": ("other-name.jpg", image_bytes, "image/jpeg")})
+    finally:
+        shutdown_image_pool()
+
+    filename = first.json()["image"]
+    assert filename == second.json()["image"]
+    assert filename.endswith(".jpg") and len(filename) == 64 + 4
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+    response = client.get(f"/products/images/{filename}", params={"size": "thumbnail"})
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert len(response.content) < len(image_bytes)
+
+    revalidated = client.get(f"/products/images/{filename}", headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 200  # the original has its own ETag
+    revalidated = client.get(
+        f"/products/images/{filename}", params={"size": "thumbnail"},
+        headers={"If-None-Match": response.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
+
+    partial = client.get(f"/products/images/{filename}", headers={"Range": "bytes=0-99"})
+    assert partial.status_code == 206
+    assert partial.content == image_bytes[:100]
+
+
+def test_oversized_uploads_are_rejected(client, tmp_path, monkeypatch):
+    from api.endpoints import product
+    from core.config import settings
+
+    monkeypatch.setattr(product, "IMAGE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "MAX_IMAGE_UPLOAD_BYTES", 1024)
+    form = {"name": "Orange", "supplier_id": "1", "price": "30.5", "stock": "10", "unit": "kg"}
+
+    response = client.post("/products/", data=form, files={"image": ("big.jpg", b"x" * 4096, "image/jpeg")})
+
+    assert response.status_code == 413
+    assert os.listdir(tmp_path) == []
+
+
+def test_declared_oversized_uploads_are_rejected_before_parsing(client, tmp_path, monkeypatch):
+    from api.endpoints import product
+    from core.config import settings
+    from helpers import images
+
+    async def save_upload(*args, **kwargs):
+        raise AssertionError("the form should not have been parsed")
+
+    monkeypatch.setattr(product, "IMAGE_DIR", str(tmp_path))
+    monkeypatch.setattr(product, "save_upload", save_upload)
+    monkeypatch.setattr(settings, "MAX_IMAGE_UPLOAD_BYTES", 1024)
+    monkeypatch.setattr(images, "UPLOAD_FORM_OVERHEAD", 512)
+    form = {"name": "Orange", "supplier_id": "1", "price": "30.5", "stock": "10", "unit": "kg"}
+
+    response = client.post("/products/", data=form, files={"image": ("big.jpg", b"x" * 4096, "image/jpeg")})
+
+    assert response.status_code == 413
+    assert response.json()["detail"] == "Request body exceeds 1536 bytes"
+    assert os.listdir(tmp_path) == []
+
+
+def test_legacy_image_names_are_served_and_revalidated(client, tmp_path, monkeypatch):
+    from api.endpoints import product
+
+    monkeypatch.setattr(product, "IMAGE_DIR", str(tmp_path))
+    Image.new("RGB", (100, 100)).save(tmp_path / "Orange_orange.jpg")
+
+    for params in ({}, {"size": "thumbnail"}):  # no derivative yet, so both serve the original
+        response = client.get("/products/images/Orange_orange.jpg", params=params)
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == "public, no-cache"
+
+        revalidated = client.get(
+            "/products/images/Orange_orange.jpg", params=params,
+            headers={"If-None-Match": response.headers["etag"]}
+        )
+        assert revalidated.status_code == 304
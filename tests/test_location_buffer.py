@@ -0,0 +1,98 @@
+import asyncio
+import sys
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from api.endpoints import driver as driver_endpoints
+from db.models import Driver, User
+from helpers.driver_index import DriverGridIndex
+from helpers.location_buffer import LocationBuffer
+from tests.conftest import QueryCounter
+
+
+@pytest.fixture
+def buffer(async_engine, monkeypatch):
+    buffer = LocationBuffer(
+        flush_interval=3600,
+        session_factory=async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False),
+    )
+    monkeypatch.setattr(driver_endpoints, "location_buffer", buffer)
+    return buffer
+
+
+def make_drivers(db_session, count):
+    drivers = [
+        Driver(user=User(
+            email=f"driver{i}@example.com",
+            full_name=f"Driver {i}",
+            username=f"driver{i}",
+            hashed_password="not-a-real-hash",
+        ))
+        for i in range(count)
+    ]
+    db_session.add_all(drivers)
+    db_session.commit()
+    return drivers
+
+
+def stored_position(db_session, driver):
+    db_session.refresh(driver)
+    return driver.latitude, driver.longitude
+
+
+def test_pings_are_coalesced_into_one_batched_flush(db_session, async_engine, buffer):
+    drivers = make_drivers(db_session, 3)
+    for step in range(5):
+        for driver in drivers:
+            buffer.record(driver.id, -26.0 - step, 28.0 + driver.id)
+
+    assert buffer.get(drivers[0].id) == (-30.0, 28.0 + drivers[0].id)
+    assert stored_position(db_session, drivers[0]) == (None, None)
+
+    counter = QueryCounter(async_engine.sync_engine)
+    assert asyncio.run(buffer.flush()) == 3
+    counter.remove()
+    assert [statement.split()[0] for statement in counter.statements] == ["UPDATE"]
+    assert stored_position(db_session, drivers[2]) == (-30.0, 28.0 + drivers[2].id)
+
+    # Nothing changed since, so the next flush has nothing to write
+    assert asyncio.run(buffer.flush()) == 0
+
+
+def test_location_endpoint_writes_behind_and_reads_overlay(client, db_session, buffer):
+    driver = make_drivers(db_session, 1)[0]
+
+    assert client.post("/drivers/driver/999/location", json={"latitude": 1, "longitude": 2}).status_code == 404
+    for lat in (-26.1, -26.2, -26.3):
+        response = client.post(f"/drivers/driver/{driver.id}/location", json={"latitude": lat, "longitude": 28.0})
+        assert response.status_code == 200
+
+    assert stored_position(db_session, driver) == (None, None)
+    body = client.get(f"/drivers/{driver.id}").json()
+    assert (body["latitude"], body["longitude"]) == (-26.3, 28.0)
+
+    asyncio.run(buffer.stop())
+    assert stored_position(db_session, driver) == (-26.3, 28.0)
+
+
+def test_status_changes_index_the_buffered_position(client, db_session, buffer, monkeypatch):
+    index = DriverGridIndex()
+    monkeypatch.setattr(driver_endpoints, "driver_index", index)
+    monkeypatch.setattr(sys.modules["helpers.location_buffer"], "driver_index", index)
+    driver = make_drivers(db_session, 1)[0]
+    driver.status = "busy"
+    db_session.commit()
+
+    client.post(f"/drivers/driver/{driver.id}/location", json={"latitude": -26.2, "longitude": 28.0})
+    assert driver.id not in index
+
+    client.patch(f"/drivers/{driver.id}/status", json={"status": "available"})
+    assert [driver_id for driver_id, _ in index.query_radius(-26.2, 28.0, 1)] == [driver.id]
+
+    client.post(f"/drivers/driver/{driver.id}/location", json={"latitude": -33.9, "longitude": 18.4})
+    assert [driver_id for driver_id, _ in index.query_radius(-33.9, 18.4, 1)] == [driver.id]
+
+    assert client.delete(f"/drivers/{driver.id}").status_code == 200
+    assert driver.id not in index and driver.id not in buffer
+    assert asyncio.run(buffer.flush()) == 0
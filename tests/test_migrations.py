@@ -0,0 +1,121 @@
+import re
+import threading
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from db.base import Base
+from db.migrations import MIGRATIONS, prepare_database, run_migrations
+from db.models import Driver, DriverClaim, Notification, Order, OrderItem, Product
+from db.queries import order_query
+
+FULL_SCAN = re.compile(r"^SCAN (TABLE )?\w+$")
+
+
+NEWEST_FIRST = (Order.created.desc(), Order.id.desc())
+
+# The hot filters of the order, claim, notification, product and driver endpoints
+ENDPOINT_QUERIES = {
+    "orders_by_user": lambda db: order_query(db).filter(Order.user_id == 1).order_by(*NEWEST_FIRST).limit(51),
+    "orders_by_driver_shipped": lambda db: order_query(db)
+        .filter(Order.driver_id == 1)
+        .filter(Order.delivery_status == "shipped")
+        .order_by(*NEWEST_FIRST).limit(51),
+    "orders_assigned": lambda db: order_query(db).filter(Order.driver_id == 1).order_by(*NEWEST_FIRST).limit(51),
+    "orders_available": lambda db: order_query(db).filter(Order.driver_id == None).order_by(Order.created.desc()),
+    "orders_unassigned_paid": lambda db: order_query(db)
+        .filter(Order.driver_id.is_(None), Order.payment_status != "unpaid")
+        .order_by(*NEWEST_FIRST).limit(51),
+    "order_items_for_orders": lambda db: db.query(OrderItem).filter(OrderItem.order_id.in_([1, 2, 3])),
+    "existing_claim": lambda db: db.query(DriverClaim).filter_by(order_id=1, driver_id=1),
+    "claims_to_cancel": lambda db: db.query(DriverClaim).filter(
+        DriverClaim.order_id == 1,
+        DriverClaim.id != 1,
+        DriverClaim.status == "pending",
+        DriverClaim.claim_type == "system",
+    ),
+    "driver_system_claims": lambda db: db.query(DriverClaim)
+        .filter(DriverClaim.driver_id == 1, DriverClaim.claim_type == "system", DriverClaim.status != "cancelled")
+        .order_by(DriverClaim.created.desc()),
+    "claims_by_type": lambda db: db.query(DriverClaim)
+        .filter(DriverClaim.claim_type == "driver")
+        .order_by(DriverClaim.created.desc()),
+    "user_unseen_notifications": lambda db: db.query(Notification).filter_by(user_id=1, status="unseen"),
+    "unseen_notifications": lambda db: db.query(Notification).filter_by(status="unseen"),
+    "notification_inbox": lambda db: db.query(Notification)
+        .filter(Notification.user_id == 1)
+        .order_by(Notification.created.desc(), Notification.id.desc()).limit(51),
+    "unseen_notification_inbox": lambda db: db.query(Notification)
+        .filter(Notification.user_id == 1, Notification.status == "unseen")
+        .order_by(Notification.created.desc(), Notification.id.desc()).limit(51),
+    "products_in_stock": lambda db: db.query(Product).filter(Product.is_active == True, Product.stock > 0).limit(100),
+    "related_products": lambda db: db.query(Product).filter(Product.category_id == 1, Product.id != 1).limit(3),
+    "available_drivers": lambda db: db.query(Driver).filter(Driver.is_active == True, Driver.status == "available"),
+    "driver_for_user": lambda db: db.query(Driver).filter(Driver.user_id == 1),
+}
+
+
+def query_plan(db, query):
+    sql = query.statement.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+    return [row.detail for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+@pytest.mark.parametrize("name", sorted(ENDPOINT_QUERIES))
+def test_endpoint_query_uses_an_index(db_session, name):
+    plan = query_plan(db_session, ENDPOINT_QUERIES[name](db_session))
+    assert not [step for step in plan if FULL_SCAN.match(step)], plan
+    assert not [step for step in plan if "TEMP B-TREE" in step], plan
+
+
+def test_migrations_are_recorded_and_not_reapplied(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(bind=engine)
+
+    assert run_migrations(engine) == [migration.version for migration in MIGRATIONS]
+    assert run_migrations(engine) == []
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("notifications")}
+    assert "ix_notifications_unseen" in indexes
+    engine.dispose()
+
+
+def test_notification_counters_are_backfilled(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        for user_id, status in [(1, "unseen"), (1, "unseen"), (1, "seen"), (2, "unseen")]:
+            connection.execute(text(
+                "INSERT INTO notifications (user_id, message, header, event_type, object_id, status) "
+                "VALUES (:user_id, 'm', 'h', 'Order', 1, :status)"
+            ), {"user_id": user_id, "status": status})
+
+    run_migrations(engine)
+    with engine.connect() as connection:
+        counts = dict(connection.execute(text("SELECT user_id, unseen FROM notification_counters")).all())
+    assert counts == {1: 2, 2: 1}
+    engine.dispose()
+
+
+def test_concurrent_workers_prepare_the_database_once(tmp_path):
+    # One engine per "worker", all starting together on an empty database file
+    engines = [create_engine(f"sqlite:///{tmp_path / 'app.db'}") for _ in range(4)]
+    barrier = threading.Barrier(len(engines))
+    results, errors = [], []
+
+    def boot(engine):
+        barrier.wait()
+        try:
+            results.append(prepare_database(engine))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=boot, args=(engine,)) for engine in engines]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for engine in engines:
+        engine.dispose()
+
+    assert errors == []
+    assert sorted(version for applied in results for version in applied) == [migration.version for migration in MIGRATIONS]
@@ -0,0 +1,228 @@
+import asyncio
+import json
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.endpoints.notification import notification_events, stream_notifications
+from core.config import settings
+from core.pubsub import hub, user_topic
+from db.models import Driver, Notification, NotificationCounter, Order, User
+from db.models.notifications import adjust_unseen_counts
+from tests.conftest import QueryCounter
+
+
+def make_notification(user, message):
+    return Notification(user_id=user.id, message=message, header="Order", event_type="Order", object_id=1)
+
+
+def test_notifications_are_published_only_after_commit(db_session, user):
+    async def scenario():
+        subscription = hub.subscribe(user_topic(user.id))
+        db_session.add(make_notification(user, "rolled back"))
+        db_session.flush()
+        db_session.rollback()
+        db_session.add(make_notification(user, "committed"))
+        db_session.flush()
+        assert subscription._queue.empty()
+        db_session.commit()
+        message = await asyncio.wait_for(subscription.get(), 1)
+        subscription.close()
+        return message
+
+    message = asyncio.run(scenario())
+    assert message["message"] == "committed"
+    assert message["id"] == db_session.query(Notification.id).filter_by(message="committed").scalar()
+
+
+def test_event_stream_replays_backlog_then_streams_live_events(db_session, user):
+    backlog = [make_notification(user, f"missed {i}") for i in range(2)]
+    db_session.add_all(backlog)
+    db_session.commit()
+
+    async def scenario():
+        subscription = hub.subscribe(user_topic(user.id))
+        events = notification_events(subscription, backlog, last_id=0, heartbeat=0.05)
+        received = [await events.__anext__(), await events.__anext__()]
+
+        # Created while the backlog was being read: already sent, so skipped
+        hub.publish(user_topic(user.id), {"id": backlog[1].id})
+        db_session.add(make_notification(user, "live"))
+        db_session.commit()
+        received.append(await events.__anext__())
+        received.append(await events.__anext__())
+        await events.aclose()
+        return received, hub.subscriber_count(user_topic(user.id))
+
+    received, subscribers = asyncio.run(scenario())
+    ids = [line.split(": ", 1)[1] for event in received[:3] for line in event.splitlines() if line.startswith("id:")]
+    assert ids == [str(backlog[0].id), str(backlog[1].id), str(backlog[1].id + 1)]
+    assert json.loads(received[2].splitlines()[2][len("data: "):])["message"] == "live"
+    assert received[3] == ": keep-alive\n\n"
+    assert subscribers == 0
+
+
+def test_stream_resumes_after_last_event_id(db_session, async_engine, user):
+    notifications = [make_notification(user, f"message {i}") for i in range(3)]
+    db_session.add_all(notifications)
+    db_session.commit()
+
+    async def scenario():
+        async with AsyncSession(async_engine) as db:
+            response = await stream_notifications(last_event_id=str(notifications[0].id), db=db, current_user=user)
+        first = await response.body_iterator.__anext__()
+        second = await response.body_iterator.__anext__()
+        await response.body_iterator.aclose()
+        return response, [first, second]
+
+    response, events = asyncio.run(scenario())
+    assert response.media_type == "text/event-stream"
+    assert [event.splitlines()[0] for event in events] == [f"id: {notifications[1].id}", f"id: {notifications[2].id}"]
+
+
+def test_stream_asks_clients_too_far_behind_to_resync(db_session, async_engine, user, monkeypatch):
+    monkeypatch.setattr(settings, "SSE_BACKLOG_LIMIT", 1)
+    notifications = [make_notification(user, f"message {i}") for i in range(4)]
+    db_session.add_all(notifications)
+    db_session.commit()
+
+    async def scenario():
+        async with AsyncSession(async_engine) as db:
+            response = await stream_notifications(last_event_id=str(notifications[0].id), db=db, current_user=user)
+        first = await response.body_iterator.__anext__()
+        await response.body_iterator.aclose()
+        return first
+
+    first = asyncio.run(scenario())
+    assert first.splitlines()[:2] == [f"id: {notifications[3].id}", "event: resync"]
+
+
+def test_stream_setup_failure_closes_the_subscription(user):
+    class BrokenSession:
+        async def scalars(self, statement):
+            raise RuntimeError("database is gone")
+
+    async def scenario():
+        try:
+            await stream_notifications(last_event_id="1", db=BrokenSession(), current_user=user)
+        except RuntimeError:
+            return hub.subscriber_count(user_topic(user.id))
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_unseen_counter_follows_single_and_bulk_mark_seen(client, db_session, async_engine, user):
+    notifications = [make_notification(user, f"message {i}") for i in range(5)]
+    db_session.add_all(notifications)
+    db_session.commit()
+    assert client.get("/notifications/unseen-count").json() == {"unseen": 5}
+
+    assert client.put(f"/notifications/{notifications[0].id}/mark-seen").status_code == 200
+    assert client.get("/notifications/unseen-count").json() == {"unseen": 4}
+
+    # Already seen rows are not counted twice
+    response = client.put("/notifications/mark-seen", json={"ids": [notifications[0].id, notifications[1].id]})
+    assert response.json() == {"updated": 1, "unseen": 3}
+
+    counter = QueryCounter(async_engine.sync_engine)
+    response = client.put("/notifications/mark-seen", json={})
+    counter.remove()
+    assert response.json() == {"updated": 3, "unseen": 0}
+    assert len([statement for statement in counter.statements if statement.startswith("UPDATE notifications")]) == 1
+
+
+def test_unseen_counter_follows_changes_to_expired_instances(db_session, user):
+    notifications = [make_notification(user, f"message {i}") for i in range(2)]
+    db_session.add_all(notifications)
+    db_session.commit()  # expires both, so their old status is not loaded
+
+    notifications[0].status = "seen"
+    db_session.delete(notifications[1])
+    db_session.commit()
+
+    assert db_session.get(NotificationCounter, user.id).unseen == 0
+
+
+def test_unseen_counter_is_never_created_negative(db_session, user):
+    adjust_unseen_counts(db_session, {user.id: -2})
+    db_session.commit()
+    assert db_session.get(NotificationCounter, user.id).unseen == 0
+
+    adjust_unseen_counts(db_session, {user.id: 3})
+    adjust_unseen_counts(db_session, {user.id: -1})
+    db_session.commit()
+    db_session.expire_all()
+    assert db_session.get(NotificationCounter, user.id).unseen == 2
+
+
+def test_legacy_unseen_lists_are_bounded_and_authorised(client, db_session, user):
+    notifications = [make_notification(user, f"message {i}") for i in range(3)]
+    db_session.add_all(notifications)
+    db_session.commit()
+
+    response = client.get(f"/notifications/user/{user.id}/unseen", params={"limit": 2})
+    assert [item["id"] for item in response.json()] == [notifications[2].id, notifications[1].id]
+    assert client.get(f"/notifications/user/{user.id + 1}/unseen").status_code == 403
+    assert client.get("/notifications/unseen").status_code == 403
+
+    user.role = "admin"
+    db_session.commit()
+    assert len(client.get("/notifications/unseen", params={"limit": 2}).json()) == 2
+
+
+def test_inbox_pages_newest_first(client, db_session, user):
+    notifications = [make_notification(user, f"message {i}") for i in range(5)]
+    db_session.add_all(notifications)
+    db_session.commit()
+    client.put(f"/notifications/{notifications[4].id}/mark-seen")
+
+    seen, cursor = [], None
+    while True:
+        page = client.get("/notifications/inbox", params={"limit": 2, **({"cursor": cursor} if cursor else {})}).json()
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [notification.id for notification in reversed(notifications)]
+
+    unseen = client.get("/notifications/inbox", params={"unseen_only": True}).json()["items"]
+    assert [item["id"] for item in unseen] == [notification.id for notification in reversed(notifications[:4])]
+
+
+def test_notifications_join_the_state_change_transaction(client, db_session, engine, user):
+    order = Order(user_id=user.id, delivery_status="shipped")
+    db_session.add(order)
+    db_session.commit()
+
+    commits = []
+    record_commit = lambda connection: commits.append(connection)
+    event.listen(engine, "commit", record_commit)
+    try:
+        assert client.post(f"/orders/{order.id}/confirm-delivery").status_code == 200
+    finally:
+        event.remove(engine, "commit", record_commit)
+
+    assert len(commits) == 1
+    notification = db_session.query(Notification).filter_by(user_id=user.id, object_id=order.id).one()
+    assert notification.header == "Order Completed"
+    assert client.get("/notifications/unseen-count").json() == {"unseen": 1}
+
+
+def test_driver_notifications_go_to_the_driver_user(client, db_session, user):
+    # The customer already holds users.id 1, so drivers.id and users.id differ for the driver below
+    db_session.add(Driver(user=User(email="other@example.com", full_name="Other", username="other", hashed_password="x")))
+    driver_user = User(email="driver@example.com", full_name="Driver", username="driver", hashed_password="x")
+    driver = Driver(user=driver_user)
+    orders = [Order(user_id=user.id), Order(user_id=user.id)]
+    db_session.add_all([driver, *orders])
+    db_session.commit()
+    assert driver.id != driver_user.id
+
+    assert client.put(f"/orders/{orders[0].id}/assign-driver", json={"driver_id": driver.id}).status_code == 200
+    assert client.post(f"/claims/claim/order/{orders[1].id}/driver/{driver.id}").status_code == 200
+
+    headers = [
+        notification.header
+        for notification in db_session.query(Notification).filter_by(user_id=driver_user.id).order_by(Notification.id)
+    ]
+    assert headers == ["Order Assigned", "Claim Creation"]
@@ -0,0 +1,300 @@
+import asyncio
+import itertools
+import sqlite3
+import threading
+
+from sqlalchemy.orm import sessionmaker
+
+from db.models import Driver, DriverClaim, Order, OrderItem, Product, User
+from helpers import cart_helpers, nearby_drivers
+from helpers.driver_index import DriverGridIndex
+
+
+def make_orders(db_session, user, count, items_per_order=2):
+    orders = []
+    for _ in range(count):
+        order = Order(user_id=user.id, total_amount=0)
+        order.items = [
+            OrderItem(product_id=1, name="Orange", quantity=1, price=10.0)
+            for _ in range(items_per_order)
+        ]
+        orders.append(order)
+    db_session.add_all(orders)
+    db_session.commit()
+    return orders
+
+
+def test_list_orders_pages_with_cursor(client, db_session, user):
+    # All rows share the same CURRENT_TIMESTAMP second, so ties are broken by id
+    orders = make_orders(db_session, user, 5)
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/orders/", params=params).json()
+        seen.extend(order["id"] for order in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == sorted((order.id for order in orders), reverse=True)
+
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get("/orders/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_order_lists_use_constant_number_of_queries(client, db_session, user, query_counter):
+    make_orders(db_session, user, 2)
+    query_counter.reset()
+    assert client.get("/orders/", params={"limit": 100}).status_code == 200
+    small_page_queries = query_counter.count
+
+    make_orders(db_session, user, 30, items_per_order=3)
+    query_counter.reset()
+    response = client.get(f"/orders/user/{user.id}/orders", params={"limit": 100})
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 32
+
+    assert query_counter.count == small_page_queries
+
+
+def test_order_total_is_maintained_when_items_change(db_session, user):
+    order = make_orders(db_session, user, 1)[0]
+    assert order.total == 20.0
+
+    order.items.append(OrderItem(product_id=2, name="Mango", quantity=3, price=5.0))
+    db_session.commit()
+    assert order.total == 35.0
+
+    db_session.delete(order.items[0])
+    db_session.commit()
+    assert order.total_amount == 25.0
+
+
+def checkout_payload(payment_method):
+    return {
+        "items": [
+            {"product_id": 1, "name": "Orange", "quantity": 2, "price": 10.0},
+            {"product_id": 2, "name": "Mango", "quantity": 1, "price": 5.0},
+        ],
+        "email": "customer@example.com",
+        "address": "1 Main Road",
+        "latitude": -26.2,
+        "longitude": 28.04,
+        "phone": "0820000000",
+        "payment_method": payment_method,
+    }
+
+
+def test_cash_checkout_runs_on_the_async_session(client, db_session, monkeypatch):
+    from core.tasks import task_queue
+
+    enqueued = []
+    monkeypatch.setattr(task_queue, "enqueue", lambda func, *args, **kwargs: enqueued.append(func.__name__))
+
+    response = client.post("/cart/checkout/", json=checkout_payload("cash"))
+    assert response.status_code == 200
+    assert enqueued == ["notify_order_created", "dispatch_driver_claims"]
+
+    order = db_session.get(Order, response.json()["order_id"])
+    assert len(order.items) == 2
+    assert order.total == 25.0
+
+
+def test_checkout_commits_the_order_before_calling_paystack(client, db_session, database_path, monkeypatch):
+    from api.endpoints import cart
+    from core.tasks import task_queue
+    from helpers.paystack import PaystackError
+
+    enqueued = []
+    monkeypatch.setattr(task_queue, "enqueue", lambda func, *args, **kwargs: enqueued.append(func.__name__))
+    write_lock_free = []
+
+    async def initialize(payload, user_id, order_id, amount_cents, reference):
+        # Another writer must be able to take the write lock without waiting
+        connection = sqlite3.connect(database_path, timeout=0)
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.rollback()
+            write_lock_free.append(True)
+        except sqlite3.OperationalError:
+            write_lock_free.append(False)
+        finally:
+            connection.close()
+        if len(write_lock_free) > 1:
+            raise PaystackError("Paystack is down")
+        return {"authorization_url": "https://checkout.paystack.test/ref", "access_code": "code", "reference": reference}
+
+    monkeypatch.setattr(cart, "initialize_paystack_transaction", initialize)
+
+    response = client.post("/cart/checkout/", json=checkout_payload("card"))
+    assert response.status_code == 200
+    assert db_session.get(Order, response.json()["order_id"]).payment_status == "unpaid"
+
+    # A failed initialization keeps the committed order, marked failed, and skips the side effects
+    assert client.post("/cart/checkout/", json=checkout_payload("card")).status_code == 500
+    failed = db_session.query(Order).order_by(Order.id.desc()).first()
+    assert failed.payment_status == "failed"
+    assert write_lock_free == [True, True]
+    assert enqueued == ["notify_order_created", "dispatch_driver_claims"]
+
+
+def test_update_order_location(client, db_session, user):
+    order = make_orders(db_session, user, 1)[0]
+    response = client.post(f"/orders/order/{order.id}/location", json={
+        "destination_latitude": -33.92,
+        "destination_longitude": 18.42,
+    })
+    assert response.status_code == 200
+
+    db_session.refresh(order)
+    assert (order.destination_latitude, order.destination_longitude) == (-33.92, 18.42)
+    assert client.post("/orders/order/999/location", json={}).status_code == 404
+
+
+def make_products(db_session, stocks):
+    products = [
+        Product(name=f"Fruit {i}", price=10.0 + i, unit="kg", stock=stock, supplier_id=1)
+        for i, stock in enumerate(stocks)
+    ]
+    db_session.add_all(products)
+    db_session.commit()
+    return products
+
+
+def order_payload(lines):
+    return {
+        "delivery_status": None,
+        "payment_status": None,
+        "delivery_code": None,
+        "destination_latitude": None,
+        "destination_longitude": None,
+        "items": [
+            {"product_id": product.id, "name": "ignored", "quantity": quantity, "price": 0}
+            for product, quantity in lines
+        ],
+    }
+
+
+def test_create_order_decrements_stock_with_a_fixed_number_of_statements(client, db_session, query_counter):
+    small = make_products(db_session, [10, 10])
+    payload = order_payload([(small[0], 1), (small[1], 1)])
+    query_counter.reset()
+    assert client.post("/orders/", json=payload).status_code == 200
+    small_basket_statements = query_counter.count
+
+    large = make_products(db_session, [100] * 20)
+    # Repeated lines for the same product are taken out of stock together
+    payload = order_payload([(product, 2) for product in large] + [(large[0], 3)])
+    query_counter.reset()
+    response = client.post("/orders/", json=payload)
+    assert response.status_code == 200
+    assert query_counter.count == small_basket_statements
+
+    body = response.json()
+    assert len(body["items"]) == 21
+    assert body["items"][0]["name"] == large[0].name
+    assert body["total"] == sum(product.price * 2 for product in large) + large[0].price * 3
+    db_session.expire_all()
+    assert large[0].stock == 95
+    assert large[1].stock == 98
+
+
+def test_create_order_rejects_a_shortfall_without_side_effects(client, db_session):
+    products = make_products(db_session, [5, 1])
+    response = client.post("/orders/", json=order_payload([(products[0], 2), (products[1], 1), (products[1], 1)]))
+    assert response.status_code == 409
+
+    db_session.expire_all()
+    assert [product.stock for product in products] == [5, 1]
+    assert db_session.query(Order).count() == 0
+
+    assert client.post("/orders/", json=order_payload([(products[0], 5)])).status_code == 200
+    assert client.post("/orders/", json=order_payload([(products[0], 1)])).status_code == 409
+    db_session.expire_all()
+    assert products[0].stock == 0
+
+
+def test_driver_claim_fan_out_costs_a_fixed_number_of_statements(db_session, user, query_counter, monkeypatch):
+    pushed = []
+
+    async def send(messages):
+        pushed.extend(messages)
+
+    monkeypatch.setattr(cart_helpers.push_dispatcher, "send", send)
+    order = Order(user_id=user.id, destination_latitude=-26.2, destination_longitude=28.04)
+    db_session.add(order)
+    db_session.commit()
+    order_id = order.id
+    usernames = (f"driver{i}" for i in itertools.count())
+
+    def fan_out(count):
+        drivers = []
+        for username in itertools.islice(usernames, count):
+            driver_user = User(
+                email=f"{username}@example.com",
+                full_name="Driver",
+                username=username,
+                hashed_password="not-a-real-hash",
+                push_token=f"ExponentPushToken[{username}]",
+            )
+            drivers.append(Driver(user=driver_user, latitude=-26.21, longitude=28.05))
+        db_session.add_all(drivers)
+        db_session.commit()
+        index = DriverGridIndex()
+        index.load(drivers)
+        monkeypatch.setattr(nearby_drivers, "driver_index", index)
+        db_session.expunge_all()
+
+        query_counter.reset()
+        asyncio.run(cart_helpers.create_driver_claims(db_session, Driver, DriverClaim, db_session.get(Order, order_id)))
+        return query_counter.count
+
+    assert fan_out(2) == fan_out(40)
+    assert db_session.query(DriverClaim).filter_by(order_id=order_id, claim_type="system").count() == 42
+    assert len(pushed) == 42
+
+
+def test_dispatch_driver_claims_keeps_database_work_off_the_loop(engine, db_session, user, monkeypatch):
+    threads = {}
+    claim_nearby_drivers = cart_helpers.claim_nearby_drivers
+
+    def claim(*args):
+        threads["database"] = threading.get_ident()
+        return claim_nearby_drivers(*args)
+
+    async def send(messages):
+        threads["push"] = threading.get_ident()
+
+    monkeypatch.setattr(cart_helpers, "claim_nearby_drivers", claim)
+    monkeypatch.setattr(cart_helpers.push_dispatcher, "send", send)
+    monkeypatch.setattr(cart_helpers, "SessionLocal", sessionmaker(bind=engine))
+    driver_user = User(
+        email="nearby@example.com",
+        full_name="Driver",
+        username="nearby",
+        hashed_password="not-a-real-hash",
+        push_token="ExponentPushToken[nearby]",
+    )
+    driver = Driver(user=driver_user, latitude=-26.21, longitude=28.05)
+    order = Order(user_id=user.id, destination_latitude=-26.2, destination_longitude=28.04)
+    db_session.add_all([driver, order])
+    db_session.commit()
+    index = DriverGridIndex()
+    index.load([driver])
+    monkeypatch.setattr(nearby_drivers, "driver_index", index)
+
+    async def dispatch():
+        await cart_helpers.dispatch_driver_claims(order.id)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(dispatch())
+
+    assert threads["database"] != loop_thread
+    assert threads["push"] == loop_thread
+    assert db_session.query(DriverClaim).filter_by(order_id=order.id, claim_type="system").count() == 1
@@ -0,0 +1,81 @@
+import asyncio
+
+import httpx
+import pytest
+
+from helpers.paystack import PaystackClient, PaystackError
+from tests.fake_paystack import create_fake_paystack
+
+
+def make_client(fake, max_retries=2):
+    return PaystackClient(
+        secret_key="sk_test",
+        initialize_url="http://paystack.test/transaction/initialize",
+        verify_url="http://paystack.test/transaction/verify/",
+        max_retries=max_retries,
+        backoff=0,
+        transport=httpx.ASGITransport(app=fake),
+    )
+
+
+def run(client, coro_factory):
+    async def main():
+        try:
+            return await coro_factory()
+        finally:
+            await client.close()
+    return asyncio.run(main())
+
+
+def test_initialize_then_verify():
+    fake = create_fake_paystack()
+    client = make_client(fake)
+
+    async def flow():
+        init = await client.initialize_transaction({
+            "email": "customer@example.com",
+            "amount": 5000,
+            "reference": "ORDER123",
+            "metadata": {"order_id": "7"},
+        })
+        verification = await client.verify_transaction(init["reference"])
+        return init, verification
+
+    init, verification = run(client, flow)
+
+    assert init["authorization_url"].endswith("ORDER123")
+    assert verification["data"]["status"] == "success"
+    assert verification["data"]["metadata"]["order_id"] == "7"
+
+
+def test_verify_retries_transient_errors():
+    fake = create_fake_paystack(fail_times=2)
+    fake.state.transactions["REF1"] = {"amount": 100}
+    client = make_client(fake)
+
+    verification = run(client, lambda: client.verify_transaction("REF1"))
+
+    assert verification["status"] is True
+    assert fake.state.requests == 3
+
+
+def test_initialize_is_not_retried_after_server_error():
+    fake = create_fake_paystack(fail_times=1)
+    client = make_client(fake)
+
+    with pytest.raises(PaystackError):
+        run(client, lambda: client.initialize_transaction({"email": "a@b.c", "amount": 1, "reference": "REF2"}))
+
+    assert fake.state.requests == 1
+
+
+def test_initialize_reports_non_json_error_bodies():
+    client = PaystackClient(
+        secret_key="sk_test",
+        initialize_url="http://paystack.test/transaction/initialize",
+        max_retries=0,
+        transport=httpx.MockTransport(lambda request: httpx.Response(502, text="<html>Bad Gateway</html>")),
+    )
+
+    with pytest.raises(PaystackError, match="Bad Gateway"):
+        run(client, lambda: client.initialize_transaction({"email": "a@b.c", "amount": 1, "reference": "REF3"}))
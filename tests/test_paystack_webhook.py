@@ -0,0 +1,47 @@
+import hashlib
+import hmac
+import json
+
+from core.config import settings
+from db.models import Order, PaystackEvent
+
+
+def signed(body: dict):
+    raw = json.dumps(body).encode()
+    signature = hmac.new(settings.PAYSTACK_SECRET_KEY.encode(), raw, hashlib.sha512).hexdigest()
+    return raw, {"x-paystack-signature": signature, "Content-Type": "application/json"}
+
+
+def charge_success(order_id, reference="REF-1"):
+    return {
+        "event": "charge.success",
+        "data": {"reference": reference, "status": "success", "metadata": {"order_id": str(order_id)}},
+    }
+
+
+def test_unsigned_webhook_is_rejected(client):
+    response = client.post("/cart/checkout/paystack", json=charge_success(1))
+    assert response.status_code == 401
+
+
+def test_signed_webhook_marks_order_paid_once(client, db_session, user):
+    order = Order(user_id=user.id, total_amount=10)
+    db_session.add(order)
+    db_session.commit()
+
+    raw, headers = signed(charge_success(order.id))
+    first = client.post("/cart/checkout/paystack", content=raw, headers=headers)
+
+    db_session.refresh(order)
+    assert first.status_code == 200
+    assert order.payment_status == "paid"
+
+    # A redelivery is acknowledged without touching the order again
+    order.payment_status = "refunded"
+    db_session.commit()
+    second = client.post("/cart/checkout/paystack", content=raw, headers=headers)
+
+    db_session.refresh(order)
+    assert second.status_code == 200
+    assert order.payment_status == "refunded"
+    assert db_session.query(PaystackEvent).count() == 1
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from api.endpoints import driver as driver_endpoints, orders as order_endpoints
+from core.security import create_access_token
+from db.models import Driver, Order, User
+from helpers.location_buffer import LocationBuffer
+from core.pubsub import PubSubHub
+
+
+def test_slow_subscribers_drop_the_oldest_messages():
+    async def scenario():
+        hub = PubSubHub(queue_size=3)
+        subscription = hub.subscribe("order:1")
+        for i in range(5):
+            hub.publish("order:1", i)
+        assert subscription.dropped == 2
+        received = [await subscription.get() for _ in range(3)]
+        subscription.close()
+        assert hub.publish("order:1", 5) == 0
+        return received
+
+    assert asyncio.run(scenario()) == [2, 3, 4]
+
+
+def test_publish_from_another_thread_is_delivered_on_the_subscriber_loop():
+    async def scenario():
+        hub = PubSubHub()
+        subscription = hub.subscribe("driver:7")
+        publisher = threading.Thread(target=hub.publish, args=("driver:7", {"latitude": 1.0}))
+        publisher.start()
+        message = await asyncio.wait_for(subscription.get(), 1)
+        publisher.join()
+        return message
+
+    assert asyncio.run(scenario()) == {"latitude": 1.0}
+
+
+@pytest.fixture
+def tracked_order(db_session, user, async_engine, monkeypatch):
+    monkeypatch.setattr(driver_endpoints, "location_buffer", LocationBuffer(flush_interval=3600))
+    monkeypatch.setattr(order_endpoints, "location_buffer", driver_endpoints.location_buffer)
+    driver = Driver(user=User(
+        email="driver@example.com", full_name="Driver", username="driver", hashed_password="not-a-real-hash"
+    ))
+    db_session.add(driver)
+    db_session.flush()
+    order = Order(
+        user_id=user.id,
+        driver_id=driver.id,
+        delivery_status="shipped",
+        destination_latitude=-26.2041,
+        destination_longitude=28.0473,
+    )
+    db_session.add(order)
+    db_session.commit()
+    return order
+
+
+def test_tracking_socket_pushes_position_and_status_changes(client, user, tracked_order):
+    token = create_access_token({"sub": str(user.id)})
+    with client.websocket_connect(f"/orders/{tracked_order.id}/track?token={token}") as socket:
+        assert socket.receive_json() == {"type": "order", "driver_id": tracked_order.driver_id, "delivery_status": "shipped"}
+
+        for lat in (-26.1076, -26.1076, -26.2041):
+            client.post(f"/drivers/driver/{tracked_order.driver_id}/location", json={"latitude": lat, "longitude": 28.0473})
+
+        first = socket.receive_json()
+        assert first["type"] == "position"
+        assert first["distance_km"] == pytest.approx(10.73, abs=0.01)
+        assert first["delta_km"] is None
+        # The repeated fix is not sent again
+        second = socket.receive_json()
+        assert (second["distance_km"], second["delta_km"]) == (0.0, -first["distance_km"])
+
+        assert client.post(f"/orders/{tracked_order.id}/confirm-delivery").status_code == 200
+        assert socket.receive_json()["delivery_status"] == "completed"
+        with pytest.raises(WebSocketDisconnect):
+            socket.receive_json()
+
+
+def test_tracking_socket_rejects_other_users(client, db_session, tracked_order):
+    stranger = User(email="other@example.com", full_name="Other", username="other", hashed_password="x")
+    db_session.add(stranger)
+    db_session.commit()
+
+    for token in ("not-a-token", create_access_token({"sub": str(stranger.id)})):
+        with pytest.raises(WebSocketDisconnect) as closed:
+            with client.websocket_connect(f"/orders/{tracked_order.id}/track?token={token}") as socket:
+                socket.receive_json()
+        assert closed.value.code == 1008
@@ -0,0 +1,59 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI, Request
+
+from helpers.notifications import PushDispatcher, build_push_message
+
+
+def make_stub_expo(received):
+    stub = FastAPI()
+
+    @stub.post("/--/api/v2/push/send")
+    async def push_send(request: Request):
+        batch = await request.json()
+        received.append(batch)
+        return {"data": [{"status": "ok", "id": message["to"]} for message in batch]}
+
+    return stub
+
+
+def test_messages_are_sent_in_bounded_batches():
+    received = []
+    dispatcher = PushDispatcher(
+        endpoint="http://expo.test/--/api/v2/push/send",
+        batch_size=100,
+        max_concurrency=2,
+        transport=httpx.ASGITransport(app=make_stub_expo(received)),
+    )
+    messages = [build_push_message(f"ExponentPushToken[{i}]", "Order Claim", "New order") for i in range(250)]
+
+    async def run():
+        await dispatcher.start()
+        try:
+            return await dispatcher.send(messages)
+        finally:
+            await dispatcher.close()
+
+    tickets = asyncio.run(run())
+
+    assert sorted(len(batch) for batch in received) == [50, 100, 100]
+    assert len(tickets) == 250
+
+
+def test_failed_batches_are_skipped():
+    def failing(request):
+        return httpx.Response(500)
+
+    dispatcher = PushDispatcher(
+        endpoint="http://expo.test/--/api/v2/push/send",
+        transport=httpx.MockTransport(failing),
+    )
+
+    async def run():
+        try:
+            return await dispatcher.send([build_push_message("ExponentPushToken[1]", "t", "b")])
+        finally:
+            await dispatcher.close()
+
+    assert asyncio.run(run()) == []
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from sqlalchemy import event
+
+from core import security
+from core.security import PasswordHasher
+from db.models import User
+
+
+def test_login_rehashes_when_cost_changes(client, db_session, monkeypatch):
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("Pa55word@2035")
+    db_session.add(User(email="driver@example.com", full_name="Peter Smith", username="driver", hashed_password=old_hash))
+    db_session.commit()
+    monkeypatch.setattr(security, "pwd_context", CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=5))
+
+    response = client.post("/auth/token", data={"username": "driver", "password": "Pa55word@2035"})
+
+    assert response.status_code == 200
+    new_hash = db_session.query(User.hashed_password).filter(User.username == "driver").scalar()
+    assert new_hash != old_hash and new_hash.startswith("$2b$05$")
+    assert client.post("/auth/token", data={"username": "driver", "password": "wrong"}).status_code == 400
+
+
+def test_login_and_signup_keep_queries_off_the_event_loop(client, engine, db_session, monkeypatch):
+    monkeypatch.setattr(security, "pwd_context", CryptContext(schemes=["bcrypt"], bcrypt__rounds=4))
+    on_loop = []
+
+    def before_cursor_execute(*args):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.post("/users/", json={
+            "email": "new@example.com", "full_name": "New User", "username": "new",
+            "password": "Pa55word@2035", "role": "customer", "is_active": True,
+        })
+        assert response.status_code == 200
+        assert client.post("/auth/token", data={"username": "new", "password": "Pa55word@2035"}).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    assert on_loop and not any(on_loop)
+
+
+def test_hasher_rejects_calls_beyond_queue_limit():
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def run():
+        blocked = [asyncio.ensure_future(hasher.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert hasher.stats()["queued"] == 1
+        with pytest.raises(HTTPException) as exc:
+            await hasher.run(release.wait)
+        release.set()
+        await asyncio.gather(*blocked)
+        return exc.value.status_code
+
+    try:
+        assert asyncio.run(run()) == 503
+    finally:
+        hasher.shutdown()
+    assert hasher.stats()["rejected"] == 1
+    assert hasher.stats()["completed"] == 2
@@ -0,0 +1,27 @@
+import asyncio
+
+from core.tasks import TaskQueue
+
+
+def test_tasks_are_retried_and_failures_reported():
+    queue = TaskQueue(workers=2, max_retries=2, retry_backoff=0)
+    attempts = {"flaky": 0}
+
+    async def flaky():
+        attempts["flaky"] += 1
+        if attempts["flaky"] < 2:
+            raise RuntimeError("temporary")
+
+    def broken():
+        raise RuntimeError("permanent")
+
+    async def run():
+        queue.start()
+        queue.enqueue(flaky)
+        queue.enqueue(broken)
+        await queue.stop()
+
+    asyncio.run(run())
+
+    assert queue.stats["flaky"] == {"succeeded": 1, "retried": 1, "failed": 0}
+    assert queue.stats["broken"] == {"succeeded": 0, "retried": 2, "failed": 1}